@@ -1,95 +1,44 @@
+import time
+launch_time = time.perf_counter()   # startup timer origin, taken before anything heavy is imported
+
 import tkinter as tk
+import tkinter.font as tkfont
 from tkinter import messagebox, filedialog, simpledialog
-from datetime import datetime, timedelta
-import threading
-import time
+from datetime import datetime
 import os
 import random
-import json
-import pygame
 import subprocess
-from PIL import Image, ImageTk  # Add this import at the top
-from appdirs import user_data_dir
-
-
-#script_dir = os.path.dirname(os.path.abspath(__file__))
+import threading
 
-appname = "ZenSamaya"
-author = "SachinHrs"
-data_dir = user_data_dir(appname, author)
-os.makedirs(data_dir, exist_ok=True)
+from zensamaya.alarm_list import AlarmListModel
+from zensamaya.audio_cache import SoundCache, sound_nbytes
+from zensamaya.core import AlarmEngine
+from zensamaya.eventlog import EventLog
+from zensamaya.frameclock import FrameClock
+from zensamaya.icons import SOURCE_ICON, ensure_icons, icon_paths
+from zensamaya.library import SoundLibrary
+from zensamaya.loudness import LoudnessAnalyzer, pygame_chunks
+from zensamaya.watcher import FolderWatcher
+from zensamaya.paths import data_path
+from zensamaya.pcm_cache import PcmDiskCache, cached_sound_loader, disk_cache_filler
+from zensamaya.playback import FADE_IN_MS, FADE_OUT_MS, MixerAudio
+from zensamaya.rotation import ShuffleBag
+from zensamaya.settings_store import SettingsStore
+from zensamaya.startup import StartupTimer, WarmUp, benchmarking
+from zensamaya.ui_queue import FRAME_MS, IDLE_MS, UiQueue
+from zensamaya.viewmodel import SessionView
 
-# Save a configuration file
-SETTINGS_FILE = os.path.join(data_dir, "settings.json")   
-log_path = os.path.join(data_dir, "events.log")    # Specify your file path
 
-def get_now():
-    return datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+#script_dir = os.path.dirname(os.path.abspath(__file__))
 
-with open(log_path, 'w') as log_file:
-    log_file.write(f'app started at {get_now()}\n')
+# Opened in __main__, so importing this module touches nothing on disk.
+# Appended by a background thread and rotated by size, so history survives restarts
+event_log = None
 
-# Step 2: Function to append a string (with added newline) to the log file
 def log_print(message):
     print(message)
-    with open(log_path, 'a') as log_file:
-        log_file.write(f"{message}\n")
-
-def log_print_now():
-    log_print(get_now())
-
-if not os.path.exists(SETTINGS_FILE):
-    with open(SETTINGS_FILE, "w") as f:
-        pass  # Just create the empty file
-
-
-pygame_lock = threading.Lock()
-global_start_time = 0.0
-
-
-def play_mp3_for_duration(stop_event, file_path, duration, update_countdown_func, mute_state):
-    global global_start_time
-    with pygame_lock:
-        try:
-            pygame.mixer.music.load(file_path)
-            pygame.mixer.music.play(loops=-1)
-            pygame.mixer.music.set_volume(0.0 if mute_state['muted'] else 1.0)
-            log_print("Alarm Triggered at ")
-            log_print_now()
-        except Exception as e:
-            log_print(f"Error playing {file_path}: {e}")
-            return
-
-    global_start_time = time.time()
-    while not stop_event.is_set():
-        elapsed = time.time() - global_start_time
-        remaining = max(0, duration - elapsed)
-        update_countdown_func(remaining)
-        if elapsed >= duration:
-            break
-        with pygame_lock:
-            try:
-                vol = 0.0 if mute_state['muted'] else 1.0
-                pygame.mixer.music.set_volume(vol)
-            except Exception as e:
-                log_print(f"Error setting volume: {e}")
-        time.sleep(0.1)
-
-    with pygame_lock:
-        try:
-            pygame.mixer.music.fadeout(2000)
-        except Exception as e:
-            log_print(f"Error during fadeout: {e}")
-    update_countdown_func(0)
-    time.sleep(2)
-    with pygame_lock:
-        try:
-            log_print("Alarm Ended at ")
-            log_print_now()
-            pygame.mixer.music.stop()
-        except Exception as e:
-            log_print(f"Error stopping music: {e}")
-
+    if event_log is not None:
+        event_log.message(message)
 
 montserrat_font = ("Montserrat", 12)
 montserrat_font_bold = ("Montserrat", 12, "bold")
@@ -144,49 +93,167 @@ class RoundedButton(tk.Canvas):
         self.itemconfig(self.text_id, text=text)
 
 
-class ScrollingLabel(tk.Label):
-    def __init__(self, master, text, width=20, delay=250, **kwargs):
-        '''width: number of visible characters; delay: ms between shifts'''
-        super().__init__(master, **kwargs)
-        self.full_text = text
-        self.display_width = width
-        self.delay = delay
-        self.position = 0
-        self.after_id = None
-        self._start_scroll()
-        
-    def _scroll_text(self):
-        full_text = self.full_text + '   '  # spacing after end
-        visible = (full_text + full_text)[self.position:self.position+self.display_width]
-        self.config(text=visible)
-        self.position = (self.position + 1) % len(full_text)
-        self.after_id = self.after(self.delay, self._scroll_text)
-
-    def _start_scroll(self):
-        self.position = 0
-        self._scroll_text()
+class ScrollingLabel(tk.Canvas):
+    '''Marquee for text wider than the label.
+
+    The text is laid out once per set_text as two canvas text items (the
+    second follows the first round the loop); scrolling only moves them, a
+    pixel at a time, so nothing is re-rendered or re-laid out per step.
+    Idle while the text fits or the label isn't mapped.
+    '''
+    def __init__(self, master, text, clock, width=20, speed=30, gap=3, font=None, **kwargs):
+        '''clock: the window's FrameClock; width: visible characters; speed: pixels per second; gap: spaces after the end'''
+        self.font = tkfont.Font(font=font or monospace_font)
+        super().__init__(master, width=self.font.measure("0") * width, height=self.font.metrics("linespace"),
+                         highlightthickness=0, bg=master.cget("bg"), **kwargs)
+        self.clock = clock
+        self.speed = speed
+        self.gap_px = self.font.measure(" " * gap)
+        self.full_text = None
+        self.text_width = 0
+        self.start_ns = None
+        self.x = None
+        self.items = [self.create_text(0, 0, anchor='nw', font=self.font) for _ in range(2)]
+        self.set_text(text)
+        self.bind("<Configure>", lambda e: self.clock.wake(self))
+        self.bind("<Map>", lambda e: self.clock.wake(self))
+        self.clock.subscribe(self, self._scroll_text)
 
     def set_text(self, new_text):
+        if new_text == self.full_text:
+            return
         self.full_text = new_text
-        self.position = 0
+        for item in self.items:
+            self.itemconfig(item, text=new_text)
+        self.text_width = self.font.measure(new_text)
+        self.start_ns = None
+        self._place(0)
+        self.clock.wake(self)
+
+    def _place(self, x):
+        if x != self.x:
+            self.x = x
+            self.coords(self.items[0], x, 0)
+            self.coords(self.items[1], x + self.text_width + self.gap_px, 0)
+
+    def _scroll_text(self, now):
+        if not self.winfo_ismapped():
+            return None     # woken again on <Map>
+        if self.text_width <= self.winfo_width():
+            self.start_ns = None
+            self._place(0)
+            return None     # fits; woken again by set_text or a resize
+        if self.start_ns is None:
+            self.start_ns = now
+        period = self.text_width + self.gap_px
+        self._place(-round((now - self.start_ns) * self.speed / 1e9 % period))
+        return 1_000_000_000 // self.speed
 
     def stop(self):
-        if self.after_id:
-            self.after_cancel(self.after_id)
-            self.after_id = None
+        self.clock.unsubscribe(self)
+
+
+class AlarmList(tk.Frame):
+    '''Scheduled sessions drawn on a canvas: only the visible rows exist as canvas items.
+
+    Rows come from an AlarmListModel; a row redraws in place when it is
+    checked or its alarm passes. on_toggle(index, checked) runs after a click.
+    '''
+    def __init__(self, master, model, rows=8, width=220, on_toggle=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = model
+        self.on_toggle = on_toggle
+        self.font = tkfont.Font(font=montserrat_font)
+        self.row_height = self.font.metrics("linespace") + 6
+        self.canvas = tk.Canvas(self, width=width, height=rows * self.row_height, highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(self, orient='vertical', command=self._yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.pack(side='left', fill='both', expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+        self._drawn = set()
+
+        self.canvas.bind("<Configure>", lambda e: self._draw_visible())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", self._on_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self._scroll(-1))
+        self.canvas.bind("<Button-5>", lambda e: self._scroll(1))
+        model.on_reset = self.reset
+        model.on_rows_changed = self.update_rows
+        self.reset()
+
+    def reset(self):
+        self.canvas.delete("all")
+        self._drawn = set()
+        n = len(self.model)
+        self.canvas.configure(scrollregion=(0, 0, 0, max(n, 1) * self.row_height))
+        self.canvas.yview_moveto(0)
+        if not n:
+            self.canvas.create_text(4, self.row_height // 2, text="No scheduled alarms.", anchor='w', font=self.font)
+        self._draw_visible()
+
+    def update_rows(self, first, last):
+        for i in range(first, last + 1):
+            if i in self._drawn:
+                self._draw_row(i)
+
+    def _visible_range(self):
+        top = int(self.canvas.canvasy(0)) // self.row_height
+        bottom = int(self.canvas.canvasy(self.canvas.winfo_height())) // self.row_height
+        return range(max(top, 0), min(bottom + 1, len(self.model)))
+
+    def _draw_visible(self):
+        visible = self._visible_range()
+        for i in self._drawn - set(visible):
+            self.canvas.delete(f"row{i}")
+        self._drawn &= set(visible)
+        for i in visible:
+            if i not in self._drawn:
+                self._draw_row(i)
+
+    def _draw_row(self, i):
+        tag = f"row{i}"
+        self.canvas.delete(tag)
+        self._drawn.add(i)
+        y = i * self.row_height
+        box = self.row_height - 10
+        colour = "gray" if self.model.is_passed(i) else "black"
+        self.canvas.create_rectangle(4, y + 5, 4 + box, y + 5 + box, outline=colour, tags=tag)
+        if self.model.is_checked(i):
+            self.canvas.create_text(4 + box // 2, y + self.row_height // 2, text="✓", fill=colour,
+                                    font=self.font, tags=tag)
+        self.canvas.create_text(box + 12, y + self.row_height // 2, text=self.model.label(i), anchor='w',
+                                fill=colour, font=self.font, tags=tag)
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self._draw_visible()
+
+    def _scroll(self, units):
+        self.canvas.yview_scroll(units, "units")
+        self._draw_visible()
+
+    def _on_wheel(self, event):
+        self._scroll(-1 if event.delta > 0 else 1)
+
+    def _on_click(self, event):
+        i = int(self.canvas.canvasy(event.y)) // self.row_height
+        if 0 <= i < len(self.model):
+            checked = self.model.toggle(i)
+            if self.on_toggle:
+                self.on_toggle(i, checked)
+
 
 class IntervalAlarmApp:
     def __init__(self, master):
         self.master = master
         self.bg_color = "white"
         master.title("Meditation Sessions 🧘")
-
-        try:
-            pygame.mixer.init()
-        except Exception as e:
-            messagebox.showerror("Audio Error", f"Pygame mixer initialization failed:\n{e}")
-            master.destroy()
-            return
+        self.icon_images = None
+        self.set_window_icon()
+        # Every countdown and animation runs off this one timer, which stops while the window can't be seen
+        self.frame_clock = FrameClock(master.after, master.after_cancel)
+        for event in ("<Map>", "<Unmap>", "<Visibility>"):
+            master.bind(event, self.on_window_visibility, add="+")
 
         montserrat_font = ("Montserrat", 12)
         montserrat_font_bold = ("Montserrat", 12, "bold")
@@ -194,6 +261,7 @@ class IntervalAlarmApp:
 
 
         self.frame_id = "load"
+        self.settings_store = SettingsStore(data_path("settings.json"))
         # Alarm setup frame (NEW STYLE)
         self.setup_frame = tk.Frame(master,padx = 20,pady=10)
         self.setup_frame.grid(row=0, column=0, sticky='nsew')
@@ -237,7 +305,7 @@ class IntervalAlarmApp:
         row += 1
 
         # Folder
-        self.folder_label = ScrollingLabel(self.setup_frame, text=self.sound_folder or "-", width=20, font=monospace_font)
+        self.folder_label = ScrollingLabel(self.setup_frame, text=self.sound_folder or "-", clock=self.frame_clock, width=20, font=monospace_font)
         
 
         tk.Label(self.setup_frame, text="🎵", font=montserrat_font).grid(row=row, column=0, sticky='w')
@@ -281,7 +349,7 @@ class IntervalAlarmApp:
         round_btn_width = 130
         round_btn_height = 30
 
-        self.next_file_label = ScrollingLabel(self.running_frame, text="", width=40, font=monospace_font)
+        self.next_file_label = ScrollingLabel(self.running_frame, text="", clock=self.frame_clock, width=40, font=monospace_font)
        
         self.next_file_label.grid(row=row, column=0, columnspan=5,rowspan=2, sticky='ew', pady=(0,6))
         self.next_file_label.bind("<Button-1>", lambda e: self.toggle_test_play_pause())
@@ -301,6 +369,9 @@ class IntervalAlarmApp:
 
         self.randomize_button.grid(row=row, column=4, sticky='e')#, padx=5, pady=(0,6))
 
+        self.stats_button = RoundedButton(self.running_frame, round_btn_width, round_btn_height, 10, 2, 'lightgray', 'systemWindowBackgroundColor',text ="📊", command=self.show_latency_stats)
+        self.stats_button.grid(row=row, column=3, sticky='e')
+
 
 
         # Add Play/Pause button next to Randomize button
@@ -369,31 +440,156 @@ class IntervalAlarmApp:
         #self.arbitrary_spinbox_label.grid_remove()
         #self.arbitrary_spinbox.grid_remove()
 
-        # Replace the simple Label with a frame to hold checkboxes
-        self.alarms_checkboxes_frame = tk.Frame(self.alarms_frame)
-        self.alarms_checkboxes_frame.pack(fill='x', padx=10, pady=5)
-
-        # Store BooleanVar for each alarm checkbox to track state
-        self.alarm_check_vars = []
+        # Virtual list: rows are drawn on demand from the model, not one Checkbutton per alarm
+        self.alarm_list_model = AlarmListModel()
+        self.alarm_list = AlarmList(self.alarms_frame, self.alarm_list_model,
+                                    on_toggle=lambda i, checked: self.save_settings())
+        self.alarm_list.pack(fill='x', padx=10, pady=5)
 
         self.alarms_frame_visible = False
 
         # State variables
-        self.alarm_times = []
         self.is_running = False
-        self.stop_alarm_event = threading.Event()
-        self.currently_ringing_index = None
         self.caffeinate_process = None
-        self.sound_files = []
-        self.next_sound_file = None
-        self.mute_state = {'muted': False}
-        self.last_set_time = None
+        rotation = ShuffleBag(weighting=self.rotation_weighting, state_path=data_path("rotation.json"))
+        rotation.favourites = set(self.favourite_sounds)
+        # One audio thread owns the mixer; it is initialised there by the warm-up, after first paint
+        disk_cache = PcmDiskCache(data_path("pcm_cache"))
+        self.audio = MixerAudio(SoundCache(cached_sound_loader(disk_cache), sound_nbytes,
+                                           filler=disk_cache_filler(disk_cache)), disk_cache,
+                                event_log=event_log, on_error=log_print,
+                                on_started=lambda end_ns: self.ui.post("session", self.frame_clock.wake, "session"),
+                                fade_in_ms=self.fade_in_ms, fade_out_ms=self.fade_out_ms, fade_curve=self.fade_curve)
+        self.engine = AlarmEngine(audio=self.audio, rotation=rotation, event_log=event_log)
+        # Engine hooks run on the scheduler, audio and watcher threads: they only post to the UI queue
+        self.ui = UiQueue()
+        self.engine.on_next_sound_changed = lambda f: self.ui.post(self.next_file_label, self.update_next_sound_label, f)
+        self.engine.on_alarm_finished = lambda idx: self.ui.post(self.countdown_label, self.on_alarm_finished, idx)
+        # Session labels are only written when their text changes
+        self.session_view = SessionView(self.engine)
+        self.session_view.bind("prev_alarm", lambda text: self.prev_alarm_label.config(text=text))
+        self.session_view.bind("next_alarm", lambda text: self.next_alarm_label.config(text=text))
+        self.session_view.bind("countdown_to_next", lambda text: self.countdown_to_next_label.config(text=text))
+        self.session_view.bind("ringing", lambda text: self.countdown_label.config(text=text))
+        self.session_view.bind("passed", self.alarm_list_model.set_passed)
+        self.library = SoundLibrary(data_path("library.sqlite3"))
+        self.loudness_analyzer = LoudnessAnalyzer(self.library, lambda path: pygame_chunks(path, self.audio.disk_cache))
+        self.audio.track_gain = self.library.gain
+        self.audio.track_duration = self.library.duration
+        self.folder_watcher = None
+        self.warm_up = None
+        self.indexing = False
 
         self.load_settings()
         self.update_water_spin(save=False)
+        # Hidden, the UI queue is still drained once a second so the session carries on
+        self.frame_clock.subscribe("ui", self.drain_ui, background_ns=1_000_000_000)
+        self.ui_wake_fds = None
+        self.start_ui_wakeup()
+        self.frame_clock.subscribe("session", self.refresh_schedule_labels)
+
+    def drain_ui(self, now=None):
+        # Applies whatever background threads posted since the last frame, latest value per widget
+        if self.ui.drain():
+            return FRAME_MS * 1_000_000     # more tends to follow (a fade, a burst of watcher events)
+        return IDLE_MS * 1_000_000          # nothing posted: a post wakes it sooner through the wake-up pipe
+
+    def start_ui_wakeup(self):
+        # A post from a background thread writes a byte to a pipe Tk watches, so the
+        # drain runs at once without that thread ever calling into Tcl
+        try:
+            read_fd, write_fd = os.pipe()
+        except OSError:
+            return
+        try:
+            os.set_blocking(read_fd, False)
+            os.set_blocking(write_fd, False)
+            self.master.tk.createfilehandler(read_fd, tk.READABLE, self.on_ui_wakeup)
+        except (AttributeError, OSError, tk.TclError):
+            # No file handlers in this Tk (Windows): posts wait for the IDLE_MS poll
+            os.close(read_fd)
+            os.close(write_fd)
+            return
+        self.ui_wake_fds = (read_fd, write_fd)
+        self.ui.on_wake = self.wake_ui
+
+    def wake_ui(self):
+        # Posting thread; a full pipe already has a wake-up pending
+        try:
+            os.write(self.ui_wake_fds[1], b"\0")
+        except (OSError, TypeError):
+            pass
+
+    def on_ui_wakeup(self, fd, mask):
+        try:
+            while os.read(fd, 512):
+                pass
+        except OSError:
+            pass
+        self.frame_clock.wake("ui")
 
-        if(self.frame_id == "running"):
-            self.master.after(100, self.set_alarms)
+    def stop_ui_wakeup(self):
+        if self.ui_wake_fds is None:
+            return
+        self.ui.on_wake = None
+        read_fd, write_fd = self.ui_wake_fds
+        self.ui_wake_fds = None
+        try:
+            self.master.tk.deletefilehandler(read_fd)
+        except (AttributeError, tk.TclError):
+            pass
+        os.close(read_fd)
+        os.close(write_fd)
+
+    def on_window_visibility(self, event):
+        if event.widget is not self.master:
+            return
+        if event.type == tk.EventType.Unmap or getattr(event, "state", None) == "VisibilityFullyObscured":
+            self.frame_clock.pause()
+        else:
+            self.frame_clock.resume()   # redraws everything that changed while hidden
+
+    def start_warm_up(self, timer=None, on_done=None):
+        """Called once the window has been drawn: mixer init, library scan and loudness in the background.
+
+        on_done(errors) runs on the Tk thread when it finishes; returning True
+        means it closed the app.
+        """
+        # Queued now so the mixer is initialised before any test play the user can click
+        mixer_ready = self.audio.init_mixer()
+        steps = [("mixer", mixer_ready.result)]
+        folder = self.sound_folder
+        if folder and os.path.isdir(folder):
+            steps.append(("library", lambda: self.library.refresh(folder)))
+            steps.append(("loudness", lambda: self.loudness_analyzer.request(folder)))
+        if self.icon_images is None:
+            steps.append(("icons", lambda: ensure_icons(SOURCE_ICON, data_path("icons"))))
+        self.warm_up = WarmUp(steps, timer)
+        self.warm_up.done.add_done_callback(lambda f: self.ui.call(self.on_warm_up_finished, f.result(), on_done))
+        self.warm_up.start()
+
+    def on_warm_up_finished(self, errors, on_done):
+        if on_done is not None and on_done(errors):
+            return  # the app was closed
+        if errors["mixer"] is not None:
+            messagebox.showerror("Audio Error", f"Pygame mixer initialization failed:\n{errors['mixer']}")
+            self.master.destroy()
+            return
+        if self.icon_images is None:
+            self.set_window_icon()
+        if self.frame_id == "running" and not self.is_running:
+            self.set_alarms()
+
+    def set_window_icon(self):
+        """Pre-scaled icons from the build or the data dir; none until the warm-up has made them."""
+        paths = icon_paths(cache_dir=data_path("icons"))
+        if not paths:
+            return
+        try:
+            self.icon_images = [tk.PhotoImage(file=p) for p in paths]
+            self.master.iconphoto(True, *self.icon_images)
+        except tk.TclError:
+            self.icon_images = None
 
     def initialise_settings_vars(self):
         """Load initial values from file (or supply defaults)."""
@@ -404,9 +600,13 @@ class IntervalAlarmApp:
         self.sound_folder = ""
         self.alarm_length_minutes = 0
         self.alarm_length_seconds = 10
+        self.rotation_weighting = None
+        self.favourite_sounds = []
+        self.fade_in_ms = FADE_IN_MS
+        self.fade_out_ms = FADE_OUT_MS
+        self.fade_curve = "linear"
         try:
-            with open(SETTINGS_FILE) as f:
-                s = json.load(f)
+            s = self.settings_store.load()
             self.start_hour     = int(s.get("start_hour", self.start_hour))
             self.start_minute   = int(s.get("start_minute", self.start_minute))
             self.start_second   = int(s.get("start_second", self.start_second))
@@ -420,6 +620,11 @@ class IntervalAlarmApp:
             self.frame_id = s.get("frame_id", self.frame_id)
             self.alarm_length_minutes = int(s.get("alarm_length_minutes", self.alarm_length_minutes))
             self.alarm_length_seconds = int(s.get("alarm_length_seconds", self.alarm_length_seconds))
+            self.rotation_weighting = s.get("rotation_weighting", self.rotation_weighting)
+            self.favourite_sounds = list(s.get("favourite_sounds", self.favourite_sounds))
+            self.fade_in_ms = int(s.get("fade_in_ms", self.fade_in_ms))
+            self.fade_out_ms = int(s.get("fade_out_ms", self.fade_out_ms))
+            self.fade_curve = s.get("fade_curve", self.fade_curve)
         except Exception:
             pass
 
@@ -467,22 +672,22 @@ class IntervalAlarmApp:
             "sound_folder": self.sound_folder,
             "alarm_length_minutes": self.alarm_length_minutes,
             "alarm_length_seconds": self.alarm_length_seconds,
-            # Save the checkboxes states as a list of bools mapped by index
-            "alarm_check_statuses": [var.get() for var in self.alarm_check_vars] if hasattr(self, 'alarm_check_vars') else [],
+            # Save the checkbox states packed one bit per alarm (see AlarmListModel.statuses)
+            "alarm_check_statuses": self.alarm_list_model.statuses() if hasattr(self, 'alarm_list_model') else [],
             "arbitrary_integer": self.arbitrary_integer_var.get(),
+            "rotation_weighting": self.rotation_weighting,
+            "favourite_sounds": self.favourite_sounds,
+            "fade_in_ms": self.fade_in_ms,
+            "fade_out_ms": self.fade_out_ms,
+            "fade_curve": self.fade_curve,
             "frame_id": self.frame_id
         }
-        try:
-            os.makedirs(os.path.dirname(SETTINGS_FILE), exist_ok=True)
-            with open(SETTINGS_FILE, "w") as f:
-                json.dump(settings, f)
-        except Exception as e:
-            log_print(f"Error saving settings: {e}")
+        # Written (coalesced) by the store's thread, not here
+        self.settings_store.save(settings)
 
     def load_settings(self):
         try:
-            with open(SETTINGS_FILE, "r") as f:
-                settings = json.load(f)
+            settings = self.settings_store.load()
             self.saved_alarm_check_statuses = settings.get("alarm_check_statuses", [])
             self.arbitrary_integer_var.set(settings.get("arbitrary_integer", 0))
         except Exception as e:
@@ -582,57 +787,24 @@ class IntervalAlarmApp:
                 pass
             self.caffeinate_process = None
     
-    def set_alarms(self):
+    def set_alarms(self, indexed=False):
         try:
+            if self.warm_up is not None:
+                self.warm_up.wait("mixer")
             # Construct datetime objects using updated internal variables, not widget.get()
-            start = datetime.combine(
-                datetime.today(),
-                datetime.min.time()
-            ).replace(
-                hour=(
-                    self.start_hour + 12 if self.start_ampm == 'PM' and self.start_hour != 12
-                    else (0 if self.start_ampm == 'AM' and self.start_hour == 12 else self.start_hour)
-                ),
-                minute=self.start_minute,
-                second=self.start_second,
-                microsecond=0
-            )
-            end = datetime.combine(
-                datetime.today(),
-                datetime.min.time()
-            ).replace(
-                hour=(
-                    self.end_hour + 12 if self.end_ampm == 'PM' and self.end_hour != 12
-                    else (0 if self.end_ampm == 'AM' and self.end_hour == 12 else self.end_hour)
-                ),
-                minute=self.end_minute,
-                second=self.end_second,
-                microsecond=0
-            )
-
-            if end <= start:
-                raise ValueError("End time must be after start time.")
-
-            num_alarms = self.num_alarms
-            if num_alarms < 2:
-                raise ValueError("At least 2 alarms required.")
-
-            sound_folder = self.sound_folder
-            if not os.path.isdir(sound_folder):
-                raise ValueError("Invalid sound folder.")
-
-            sound_files = [f for f in os.listdir(sound_folder) if f.lower().endswith(('.mp3', '.wav'))]
+            start = self.engine.at(self.start_hour, self.start_minute, self.start_second, self.start_ampm)
+            end = self.engine.at(self.end_hour, self.end_minute, self.end_second, self.end_ampm)
+            # An index lookup; the warm-up scan and the folder watcher keep it fresh
+            sound_files = self.library.indexed_files(self.sound_folder)
             if not sound_files:
-                raise ValueError("No mp3 or wav files found in sound folder.")
-
-            self.sound_files = [os.path.join(sound_folder, f) for f in sound_files]
-
-            minutes = self.alarm_length_minutes
-            seconds = self.alarm_length_seconds
-            duration = minutes * 60 + seconds
-            if duration < 1:
-                raise ValueError("Alarm duration must be at least 1 second.")
-
+                if indexed:
+                    raise ValueError("No mp3 or wav files found in sound folder.")
+                self.index_folder_then_set()
+                return
+            if self.rotation_weighting == "length":
+                self.engine.rotation.durations = {f: self.library.duration(f) for f in sound_files}
+            duration = self.alarm_length_minutes * 60 + self.alarm_length_seconds
+            self.engine.schedule(start, end, self.num_alarms, duration, sound_files)
         except Exception as e:
             messagebox.showerror("Input Error", str(e))
             return
@@ -644,37 +816,64 @@ class IntervalAlarmApp:
         self.save_settings()
 
         self.alarm_duration_seconds = duration
-        total_seconds = (end - start).total_seconds()
-        interval_seconds = total_seconds / (num_alarms - 1)
-
-        self.alarm_times.clear()
-        curr = start
-        for i in range(num_alarms):
-            if i == 0:
-                t = curr.time()
-            else:
-                curr = start + timedelta(seconds=interval_seconds * i)
-                t = curr.time()
-            self.alarm_times.append(t)
 
         self.setup_frame.grid_remove()
         self.running_frame.grid()
 
 
-        self.countdown_label.config(text=self.format_seconds(self.alarm_duration_seconds))
+        self.session_view.reset()
         self.start_caffeinate()
         self.is_running = True
-        self.stop_alarm_event.clear()
-        self.mute_state['muted'] = False
-        self.next_sound_file = random.choice(self.sound_files)
-        self.update_next_sound_label()
-        self.last_set_time = datetime.now()
 
         self.update_alarms_list()  # Refresh alarm list in the collapsible UI
 
-        threading.Thread(target=self.alarm_thread, daemon=True).start()
+        self.start_folder_watcher()
+        self.loudness_analyzer.request(self.sound_folder)
+        self.engine.run_in_thread()
+        self.frame_clock.wake("session")
         self.alarmsBox_initate = False
 
+    def index_folder_then_set(self):
+        # A folder never indexed before: scan it off the Tk thread, then Set again
+        if self.indexing:
+            return
+        self.indexing = True
+        folder = self.sound_folder
+
+        def scan():
+            error = None
+            try:
+                self.library.refresh(folder)
+            except Exception as e:
+                error = e
+            self.ui.call(self.on_folder_indexed, folder, error)
+
+        threading.Thread(target=scan, daemon=True).start()
+
+    def on_folder_indexed(self, folder, error):
+        self.indexing = False
+        if error is not None:
+            messagebox.showerror("Input Error", str(error))
+        elif folder == self.sound_folder and not self.engine.is_running:
+            self.set_alarms(indexed=True)
+
+    def start_folder_watcher(self):
+        self.stop_folder_watcher()
+        # The watcher calls back on its own thread; apply the change on the Tk thread, as Qt does
+        self.folder_watcher = FolderWatcher(self.library, self.sound_folder,
+                                            lambda added, removed: self.ui.call(self.on_library_changed, added, removed))
+        self.folder_watcher.start(self.engine.sound_files)
+
+    def on_library_changed(self, added, removed):
+        self.engine.update_sound_files(added, removed)
+        if added:
+            self.loudness_analyzer.request(self.sound_folder)
+
+    def stop_folder_watcher(self):
+        if self.folder_watcher:
+            self.folder_watcher.stop()
+            self.folder_watcher = None
+
     def toggle_alarms_list(self):
 
         if self.alarms_frame_visible:
@@ -688,141 +887,26 @@ class IntervalAlarmApp:
             self.alarms_frame_visible = True
 
     def update_alarms_list(self):
-    # Clear existing widgets in the checkboxes frame
-        for widget in self.alarms_checkboxes_frame.winfo_children():
-            widget.destroy()
-        self.alarm_check_vars = []
-
-        num_alarms = len(self.alarm_times)
-
-        if not self.alarm_times:
-            label = tk.Label(self.alarms_checkboxes_frame, text="No scheduled alarms.")
-            label.pack()
-            return
-
-        if hasattr(self, 'saved_alarm_check_statuses') and len(self.saved_alarm_check_statuses) == num_alarms:
-            self.alarm_check_statuses = self.saved_alarm_check_statuses
-        else:
-            self.alarm_check_statuses = [False]*num_alarms
-
-        for i, t in enumerate(self.alarm_times):
-            var = tk.BooleanVar(value=self.alarm_check_statuses[i])
-            cb = tk.Checkbutton(
-                self.alarms_checkboxes_frame,
-                text=f"{i+1:2d}. {t.strftime('%I:%M:%S %p')}",
-                variable=var,
-                command=self.save_settings
-                ,state="active"
-            )
-            cb.pack(anchor='w')
-            self.alarm_check_vars.append(var)
-        self.save_settings()
-        return
-
-
-    def alarm_thread(self):
-        notified = [False] * len(self.alarm_times)
-        self.currently_ringing_index = None
-
-        while self.is_running:
-            now = datetime.now().replace(microsecond=0)
-
-            # Skip triggering alarms if set_alarms was pressed less than 2 seconds ago
-            last_set_delta = False
-            if self.last_set_time and (datetime.now() - self.last_set_time).total_seconds() < 2:
-                last_set_delta = True
-
-            prev_alarm = None
-            next_alarm = None
-
-            for t in sorted(self.alarm_times):
-                alarm_dt = datetime.combine(now.date(), t)
-                if alarm_dt <= now:
-                    prev_alarm = t
-                elif alarm_dt > now and next_alarm is None:
-                    next_alarm = t
-
-            prev_text = f"⬅️ {prev_alarm.strftime('%I:%M:%S %p')}" if prev_alarm else "⬅️ None"
-            next_text = f"➡️ {next_alarm.strftime('%I:%M:%S %p')}" if next_alarm else "➡️ None"
-
-            self.prev_alarm_label.config(text=prev_text)
-            self.next_alarm_label.config(text=next_text)
-            if next_alarm:
-                next_alarm_dt = datetime.combine(now.date(), next_alarm)
-                remaining_seconds = (next_alarm_dt - now).total_seconds()
-                if remaining_seconds < 0:
-                    remaining_seconds = 0
-                hours = int(remaining_seconds) // 3600
-                minutes = (int(remaining_seconds) % 3600) // 60
-                seconds = int(remaining_seconds) % 60
-                if hours > 0:
-                    countdown_text = f"⌛ {hours}:{minutes:02}:{seconds:02}"
-                else:
-                    countdown_text = f"⌛ {minutes:02}:{seconds:02}"
-            else:
-                countdown_text = ""
-
-            self.countdown_to_next_label.config(text=countdown_text)
-
-            for i, t in enumerate(self.alarm_times):
-                alarm_dt = datetime.combine(now.date(), t)
-                if not notified[i] and now >= alarm_dt:
-                    if last_set_delta:
-                        notified[i] = True
-                        continue
-
-                    self.start_alarm(i)
-                    notified[i] = True
-                    self.mute_state['muted'] = False
-
-                    if i + 1 < len(self.alarm_times):
-                        old_file = self.next_sound_file
-                        choices = [f for f in self.sound_files if f != old_file]
-                        self.next_sound_file = random.choice(choices) if choices else old_file
-                        self.update_next_sound_label()
-                    else:
-                        self.next_sound_file = None
-                        self.update_next_sound_label()
-            time.sleep(1)
-
-    def update_countdown_label(self, remaining_seconds):
-        if remaining_seconds > 0:
-            minutes = int(remaining_seconds) // 60
-            seconds = int(remaining_seconds) % 60
-            if minutes > 0:
-                self.countdown_label.config(text=f"{minutes:02}:{seconds:02}")
-            else:
-                self.countdown_label.config(text=f"{seconds:02}")
-        else:
-            self.countdown_label.config(text=self.format_seconds(self.alarm_duration_seconds))
-
-    def format_seconds(self,seconds):
-            minutes = int(seconds) // 60
-            seconds = int(seconds) % 60
-
-            if minutes > 0:
-                 return f"{minutes:02}:{seconds:02}"
-            else:
-                 return f"{seconds:02}"
+        # The list view redraws itself from the model; saved statuses apply if the alarm count matches
+        self.alarm_list_model.reset(self.engine.alarms, getattr(self, 'saved_alarm_check_statuses', None))
+        if self.engine.alarms:
+            self.save_settings()
 
-    def start_alarm(self, idx):
-        if self.currently_ringing_index is not None:
-            # Only allow one alarm to ring at a time
-            return
 
-        def alarm_action():
-            self.currently_ringing_index = idx
-            file_path = self.next_sound_file if self.next_sound_file else random.choice(self.sound_files)
-            play_mp3_for_duration(self.stop_alarm_event, file_path, self.alarm_duration_seconds, self.update_countdown_label, self.mute_state)
-            self.countdown_label.config(text=self.format_seconds(self.alarm_duration_seconds))
-            self.mute_state['muted'] = False
-            self.currently_ringing_index = None
+    def refresh_schedule_labels(self, now=None):
+        # Display only; alarms are triggered by the engine's scheduler thread
+        if not self.is_running:
+            return None
+        self.session_view.refresh()
+        # Back just after the next displayed second rolls over
+        return self.session_view.next_refresh_ns()
 
-        threading.Thread(target=alarm_action, daemon=True).start()
+    def on_alarm_finished(self, idx):
+        self.frame_clock.wake("session")
 
-    def update_next_sound_label(self):
-        if self.next_sound_file:
-            filename = os.path.basename(self.next_sound_file)
+    def update_next_sound_label(self, next_sound_file=None):
+        if next_sound_file:
+            filename = os.path.basename(next_sound_file)
             self.next_file_label.set_text(filename)
         else:
             self.next_file_label.set_text("")
@@ -831,39 +915,39 @@ class IntervalAlarmApp:
         playtest = True if self.is_test_playing else False
         if playtest:
             self.toggle_test_play_pause()
-        if self.sound_files:
-            old_file = self.next_sound_file
-            choices = [f for f in self.sound_files if f != old_file]
-            self.next_sound_file = random.choice(choices) if choices else old_file
-            self.update_next_sound_label()
+        if self.engine.sound_files:
+            self.engine.randomize_next_sound()
             if playtest:
                 self.toggle_test_play_pause()
 
+    def show_latency_stats(self):
+        # How late each stage of alarm start-up ran against the schedule this session
+        popup = tk.Toplevel(self.master)
+        popup.title("Trigger latency")
+        popup.resizable(False, False)
+        tk.Label(popup, text=self.engine.latency.format_table(), font=monospace_font, justify='left').pack(padx=15, pady=10)
+        tk.Button(popup, text="OK", command=popup.destroy).pack(pady=(0, 10))
+
     def toggle_mute(self):
-        self.mute_state['muted'] = not self.mute_state['muted']
-        if self.mute_state['muted']:
+        if self.engine.toggle_mute():
             self.mute_btn.set_text(text="🔈 Unmute")
         else:
             self.mute_btn.set_text(text="🔇 Mute")
 
     def stop_all_alarms(self,save=True):
         self.is_running = False
-        self.stop_alarm_event.set()
+        self.engine.stop()
+        if self.engine.latency.traces:
+            self.engine.latency.dump(data_path("latency.json"))
+        self.stop_folder_watcher()
         self.stop_caffeinate()
         self.running_frame.grid_remove()
         self.setup_frame.grid()
         self.mute_btn.set_text(text="🔇 Mute")
-        self.countdown_label.config(text=self.format_seconds(self.alarm_duration_seconds))
+        self.session_view.reset()
         self.next_file_label.set_text("")
-        self.alarm_times.clear()
-        self.prev_alarm_label.config(text="⬅️ None")
-        self.next_alarm_label.config(text="➡️ None")
-        self.countdown_to_next_label.config(text="")
-        self.currently_ringing_index = None
-        self.next_sound_file = None
-        self.mute_state['muted'] = False
         self.alarms_frame.grid_remove()
-        self.alarm_check_vars.clear()
+        self.alarm_list_model.reset()
         self.alarms_frame_visible = False
         self.toggle_alarms_btn.set_text(text="▼ Show Scheduled Sessions 🕗")
         self.frame_id = "setting"
@@ -872,51 +956,45 @@ class IntervalAlarmApp:
             self.save_settings()
 
     def trigger_alarm_now(self):
-        global global_start_time
-        global_start_time = time.time()
-
         # Only trigger if no alarm is already ringing
-        if self.currently_ringing_index is not None:
+        if self.engine.ringing_index is not None:
             messagebox.showinfo("Alarm Running", "An alarm is already playing.")
             return
 
         # Immediately trigger manual alarm with same behaviour
-        if not self.sound_files:
+        if not self.engine.sound_files:
             messagebox.showerror("No Sounds", "No sound files loaded for alarms.")
             return
 
         idx = -1  # Use -1 or another value to distinguish manual trigger
-        self.start_alarm(idx)
+        self.engine.trigger(idx)
 
 
     def toggle_test_play_pause(self):
-        with pygame_lock:
-            if not self.sound_files:
-                messagebox.showerror("No Sounds", "No sound files loaded for testing.")
-                return
-            # Use the 'next_sound_file' or fallback to random sound for testing
-            test_file = self.next_sound_file if self.next_sound_file else random.choice(self.sound_files)
-
-            if not self.is_test_playing:
-                # Play or unpause
-                try:
-                    if pygame.mixer.music.get_busy():
-                        pygame.mixer.music.unpause()
-                    else:
-                        pygame.mixer.music.load(test_file)
-                        pygame.mixer.music.play(loops=-1)
-                    self.is_test_playing = True
-                except Exception as e:
-                    messagebox.showerror("Playback Error", f"Error playing sound: {e}")
-            else:
-                # Pause playback
-                try:
-                    pygame.mixer.music.pause()
-                    self.is_test_playing = False
-                except Exception as e:
-                    messagebox.showerror("Playback Error", f"Error pausing sound: {e}")
+        if not self.engine.sound_files:
+            messagebox.showerror("No Sounds", "No sound files loaded for testing.")
+            return
+        # Use the 'next_sound_file' or fallback to random sound for testing
+        test_file = self.engine.next_sound_file if self.engine.next_sound_file else random.choice(self.engine.sound_files)
+
+        if not self.is_test_playing:
+            # Play or unpause
+            try:
+                self.audio.test_play(test_file).result(timeout=5)
+                self.is_test_playing = True
+            except Exception as e:
+                messagebox.showerror("Playback Error", f"Error playing sound: {e}")
+        else:
+            # Pause playback
+            try:
+                self.audio.test_pause().result(timeout=5)
+                self.is_test_playing = False
+            except Exception as e:
+                messagebox.showerror("Playback Error", f"Error pausing sound: {e}")
 
 if __name__ == "__main__":
+    timer = StartupTimer(launch_time)
+    timer.mark("imports")
     root = tk.Tk()
 
     try:
@@ -925,17 +1003,37 @@ if __name__ == "__main__":
     except Exception:
         root.option_add("*Font", "Arial 12")
 
+    event_log = EventLog(data_path("events.log"))
+    event_log.write("app_started")
     app = IntervalAlarmApp(root)
+    timer.mark("window")
 
     def on_close():
         app.stop_all_alarms(save=False)
+        app.settings_store.close()
+        # Audio before the log: closing it still records playback_ended for the voices it stops
         try:
-            with pygame_lock:
-                pygame.mixer.quit()
+            app.audio.close()
         except Exception:
             pass
+        app.stop_ui_wakeup()
+        event_log.write("app_closed")
+        event_log.close()
         root.destroy()
 
     root.protocol("WM_DELETE_WINDOW", on_close)
+
+    def on_warm_up_done(errors):
+        timer.report(event_log)
+        if benchmarking():
+            on_close()
+            return True
+
+    def on_first_paint():
+        root.update_idletasks()
+        timer.mark("first_paint")
+        app.start_warm_up(timer, on_warm_up_done)
+
+    root.after(0, on_first_paint)
     
     root.mainloop()
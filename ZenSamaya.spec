@@ -1,16 +1,24 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+import sys
 
+sys.path.insert(0, SPECPATH)
+from zensamaya.icons import build_icons
+
+# Pre-scaled window icons, bundled so the app never decodes the full-size icon.png (or needs PIL) at startup
+icon_dir = os.path.join(workpath, 'icons')
+build_icons(os.path.join(SPECPATH, 'icon.png'), icon_dir)
 
 a = Analysis(
     ['ZenSamaya.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[(icon_dir, 'icons')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['PIL'],
     noarchive=False,
     optimize=0,
 )
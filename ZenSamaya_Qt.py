@@ -1,150 +1,317 @@
 # ZenSamaya_qt.py
-import sys, os, json, time, random, threading, subprocess
-from datetime import datetime, timedelta
+import sys, os, time, math, subprocess, threading
+launch_time = time.perf_counter()   # startup timer origin, taken before anything heavy is imported
 
-from PySide6.QtCore import Qt, QTimer, Signal, QObject
+from PySide6.QtCore import Qt, QTimer, Signal, QObject, QAbstractListModel, QModelIndex, QEvent, QPointF, QSize
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QPushButton, QSpinBox,
     QGridLayout, QVBoxLayout, QHBoxLayout, QFileDialog, QInputDialog,
-    QMessageBox, QCheckBox, QScrollArea, QSizePolicy
+    QMessageBox, QListView, QSizePolicy
 )
-from PySide6.QtGui import QIcon
-
-import pygame
+from PySide6.QtGui import QIcon, QBrush, QColor, QPainter, QPalette, QPixmap
+
+from zensamaya.alarm_list import AlarmListModel
+from zensamaya.audio_cache import SoundCache, sound_nbytes
+from zensamaya.core import AlarmEngine
+from zensamaya.eventlog import EventLog
+from zensamaya.frameclock import FrameClock
+from zensamaya.icons import SOURCE_ICON, ensure_icons, icon_paths
+from zensamaya.library import SoundLibrary
+from zensamaya.loudness import LoudnessAnalyzer, pygame_chunks
+from zensamaya.watcher import FolderWatcher
+from zensamaya.paths import data_path
+from zensamaya.pcm_cache import PcmDiskCache, cached_sound_loader, disk_cache_filler
+from zensamaya.playback import FADE_IN_MS, FADE_OUT_MS, MixerAudio
+from zensamaya.rotation import ShuffleBag
+from zensamaya.settings_store import SettingsStore
+from zensamaya.startup import StartupTimer, WarmUp, benchmarking
+from zensamaya.ui_queue import FRAME_MS
+from zensamaya.viewmodel import SessionView
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 SETTINGS_FILE = os.path.join(script_dir, ".srvn_apps", "settings.json")
 
-pygame_lock = threading.Lock()
-global_start_time = 0.0
+class RelayedAudio(QObject):
+    """AlarmEngine audio backend on top of MixerAudio's single audio thread.
 
-class AlarmWorker(QObject):
-    tick = Signal(int)            # remaining seconds
-    finished = Signal()
+    MixerAudio calls back from its own thread; those calls are re-emitted as
+    signals on this (main-thread) object, so the engine and the window only
+    ever hear about playback on the GUI thread.
+    """
     started = Signal()
     error = Signal(str)
-
-    def __init__(self, file_path: str, duration_s: int, mute_state: dict):
-        super().__init__()
-        self.file_path = file_path
-        self.duration_s = duration_s
-        self.mute_state = mute_state
-        self._stop = threading.Event()
+    _finished_signal = Signal(object)     # the on_finished of the play() that ended
+    _started_signal = Signal()
+    _error_signal = Signal(str)
+
+    def __init__(self, event_log=None, parent=None):
+        super().__init__(parent)
+        disk_cache = PcmDiskCache(data_path("pcm_cache"))
+        self.mixer = MixerAudio(SoundCache(cached_sound_loader(disk_cache), sound_nbytes,
+                                           filler=disk_cache_filler(disk_cache)), disk_cache,
+                                event_log=event_log,
+                                on_started=lambda end_ns: self._started_signal.emit(),
+                                on_error=self._error_signal.emit)
+        self._finished_signal.connect(self._finished)
+        self._started_signal.connect(self.started)
+        self._error_signal.connect(self.error)
+
+    @property
+    def playing_until_ns(self):
+        return self.mixer.playing_until_ns
+
+    def play(self, file_path, duration, mute_state, on_finished, start_ns=None, trace=None):
+        # Plays can overlap (a crossfade), so each carries its own callback across
+        self.mixer.play(file_path, duration, mute_state, lambda: self._finished_signal.emit(on_finished),
+                        start_ns, trace)
+
+    def set_muted(self, muted):
+        self.mixer.set_muted(muted)
+
+    def preload(self, file_path):
+        self.mixer.preload(file_path)
+
+    def forget(self, file_path):
+        self.mixer.forget(file_path)
 
     def stop(self):
-        self._stop.set()
-
-    def run(self):
-        global global_start_time
-        with pygame_lock:
-            try:
-                pygame.mixer.music.load(self.file_path)
-                pygame.mixer.music.play(loops=-1)
-                pygame.mixer.music.set_volume(0.0 if self.mute_state.get("muted") else 1.0)
-            except Exception as e:
-                self.error.emit(f"Error playing {self.file_path}: {e}")
-                return
-        self.started.emit()
-
-        global_start_time = time.time()
-        end_time = global_start_time + self.duration_s
-        try:
-            while not self._stop.is_set():
-                now = time.time()
-                remaining = max(0, int(end_time - now))
-                self.tick.emit(remaining)
-                if remaining <= 0:
-                    break
-                # refresh volume according to mute state
-                with pygame_lock:
-                    try:
-                        vol = 0.0 if self.mute_state.get("muted") else 1.0
-                        pygame.mixer.music.set_volume(vol)
-                    except Exception:
-                        pass
-                time.sleep(0.1)
-            with pygame_lock:
-                try:
-                    pygame.mixer.music.fadeout(2000)
-                except Exception:
-                    pass
-            time.sleep(2)
-            with pygame_lock:
-                try:
-                    pygame.mixer.music.stop()
-                except Exception:
-                    pass
-        finally:
-            self.tick.emit(0)
-            self.finished.emit()
-
-
-class ScrollingLabel(QLabel):
-    def __init__(self, text="", width_chars=30, delay_ms=250, parent=None):
-        super().__init__(text, parent)
+        self.mixer.stop()
+
+    def close(self):
+        self.mixer.close()
+
+    def _finished(self, on_finished):
+        on_finished()
+
+
+class AlarmListQtModel(QAbstractListModel):
+    """Qt face of an AlarmListModel for a QListView, which only paints the rows in view.
+
+    toggled(row, checked) is emitted when the user ticks a row.
+    """
+    toggled = Signal(int, bool)
+
+    def __init__(self, rows, parent=None):
+        super().__init__(parent)
+        self.rows = rows
+        rows.on_reset = self._on_reset
+        rows.on_rows_changed = self._on_rows_changed
+        self._passed_brush = QBrush(QColor("gray"))
+
+    def reset(self, schedule=None, checked=None):
+        self.beginResetModel()
+        self.rows.on_reset = None
+        self.rows.reset(schedule, checked)
+        self.rows.on_reset = self._on_reset
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        i = index.row()
+        if not index.isValid() or i >= len(self.rows):
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.rows.label(i)
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if self.rows.is_checked(i) else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.ForegroundRole and self.rows.is_passed(i):
+            return self._passed_brush
+        return None
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.CheckStateRole or not index.isValid():
+            return False
+        checked = Qt.CheckState(value) == Qt.CheckState.Checked
+        if self.rows.set_checked(index.row(), checked):
+            self.toggled.emit(index.row(), checked)
+        return True
+
+    def _on_reset(self):
+        self.beginResetModel()
+        self.endResetModel()
+
+    def _on_rows_changed(self, first, last):
+        self.dataChanged.emit(self.index(first), self.index(last))
+
+
+class ScrollingLabel(QWidget):
+    """Marquee for text wider than the label.
+
+    set_text renders the text once into a pixmap (at the screen's device
+    pixel ratio); scrolling only repaints that pixmap at a fractional offset,
+    so there is no per-step text layout and the motion is pixel-smooth.
+    Idle while the text fits or the label is hidden.
+    """
+    def __init__(self, text="", clock=None, width_chars=30, speed=30, gap=3, parent=None):
+        # clock: the window's FrameClock; speed: pixels per second; gap: spaces after the end
+        super().__init__(parent)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-        self.full_text = text
-        self.display_width = width_chars
-        self.pos = 0
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self._scroll)
-        self.timer.start(delay_ms)
+        self.clock = clock
+        self.width_chars = width_chars
+        self.speed = speed
+        self.gap = gap
+        self.full_text = None
+        self.pixmap = None
+        self.text_width = 0
+        self.gap_px = 0
+        self.offset = 0.0
+        self.start_ns = None
+        self.set_text(text)
+        clock.subscribe(self, self._scroll)
 
     def set_text(self, t: str):
-        self.full_text = t or ""
-        self.pos = 0
-
-    def _scroll(self):
-        full = self.full_text + " "
-        if not full:
-            self.setText("")
+        t = t or ""
+        if t == self.full_text:
             return
-        doubled = full + full
-        visible = doubled[self.pos:self.pos+self.display_width]
-        self.setText(visible)
-        self.pos = (self.pos + 1) % len(full)
+        self.full_text = t
+        self._render()
+
+    def _render(self):
+        fm = self.fontMetrics()
+        self.text_width = fm.horizontalAdvance(self.full_text)
+        self.gap_px = fm.horizontalAdvance(" " * self.gap)
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(max(1, math.ceil(self.text_width * ratio)), max(1, math.ceil(fm.height() * ratio)))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setFont(self.font())
+        painter.setPen(self.palette().color(QPalette.WindowText))
+        painter.drawText(0, fm.ascent(), self.full_text)
+        painter.end()
+        self.pixmap = pixmap
+        self.offset = 0.0
+        self.start_ns = None
+        self.updateGeometry()
+        self.update()
+        self.clock.wake(self)
+
+    def sizeHint(self):
+        fm = self.fontMetrics()
+        return QSize(fm.horizontalAdvance("0") * self.width_chars, fm.height())
+
+    def minimumSizeHint(self):
+        return QSize(0, self.fontMetrics().height())
+
+    def _scroll(self, now):
+        if not self.isVisible():
+            return None     # woken again by showEvent
+        if self.text_width <= self.width():
+            if self.offset:
+                self.offset = 0.0
+                self.update()
+            self.start_ns = None
+            return None     # fits; woken again by set_text or a resize
+        if self.start_ns is None:
+            self.start_ns = now
+        self.offset = (now - self.start_ns) * self.speed / 1e9 % (self.text_width + self.gap_px)
+        self.update()
+        return FRAME_MS * 1_000_000
+
+    def paintEvent(self, event):
+        if self.pixmap is None or not self.full_text:
+            return
+        painter = QPainter(self)
+        y = (self.height() - self.fontMetrics().height()) / 2
+        painter.drawPixmap(QPointF(-self.offset, y), self.pixmap)
+        if self.text_width > self.width():
+            painter.drawPixmap(QPointF(self.text_width + self.gap_px - self.offset, y), self.pixmap)
+        painter.end()
+
+    def changeEvent(self, event):
+        if event.type() in (QEvent.FontChange, QEvent.PaletteChange, QEvent.StyleChange) \
+                and getattr(self, "full_text", None) is not None:
+            self._render()
+        super().changeEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.clock.wake(self)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.clock.wake(self)
 
 
 class IntervalAlarmApp(QMainWindow):
+    library_changed = Signal(list, list)    # (added, removed) from the folder watcher thread
+    warmed_up = Signal(object)              # {step: error or None} from the warm-up thread
+    folder_indexed = Signal(str, object)    # (folder, error or None) from the indexing thread
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Meditation Sessions 🧘")
-        # pygame init
-        try:
-            pygame.mixer.init()
-        except Exception as e:
-            QMessageBox.critical(self, "Audio Error", f"Pygame mixer initialization failed:\n{e}")
-            sys.exit(1)
+        # every countdown and animation runs off this one timer, which stops while the window can't be seen
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.timeout.connect(self._on_frame_timer)
+        self._frame_fn = None
+        self.frame_clock = FrameClock(self._call_later, self._cancel_later)
+        self._watching_expose = False
 
         # state
         self.frame_id = "load"
         self.alarm_duration_seconds = 0
-        self.alarm_times = []
         self.is_running = False
-        self.current_worker = None
-        self.current_thread = None
         self.caffeinate_process = None
-        self.sound_files = []
-        self.next_sound_file = None
-        self.mute_state = {"muted": False}
-        self.last_set_time = None
-        self.alarm_check_vars = []
+        self.event_log = EventLog(data_path("events.log"))
+        self.event_log.write("app_started")
+        self.audio = RelayedAudio(self.event_log, self)
+        self.audio.started.connect(lambda: self.frame_clock.wake("session"))
+        self.audio.error.connect(self._on_alarm_error)
+        self.engine = AlarmEngine(audio=self.audio, rotation=ShuffleBag(state_path=data_path("rotation.json")),
+                                  event_log=self.event_log)
+        self.engine.on_next_sound_changed = self._update_next_sound_label
+        self.engine.on_alarm_finished = lambda idx: self.frame_clock.wake("session")
+        self.library = SoundLibrary(data_path("library.sqlite3"))
+        self.loudness_analyzer = LoudnessAnalyzer(self.library, lambda path: pygame_chunks(path, self.audio.mixer.disk_cache))
+        self.audio.mixer.track_gain = self.library.gain
+        self.audio.mixer.track_duration = self.library.duration
+        self.folder_watcher = None
+        self.library_changed.connect(self._on_library_changed)
+        self.warm_up = None
+        self.indexing = False
+        self.warm_up_done = None
+        self.warmed_up.connect(self._on_warmed_up)
+        self.folder_indexed.connect(self._on_folder_indexed)
+        self.alarm_list_model = AlarmListQtModel(AlarmListModel(), self)
+        self.alarm_list_model.toggled.connect(lambda row, checked: self._save_settings())
         self.saved_alarm_check_statuses = []
         self.alarms_frame_visible = False
 
         # defaults + settings
+        self.settings_store = SettingsStore(SETTINGS_FILE)
         self._defaults()
         self._load_settings_min()
+        self.engine.rotation.weighting = self.rotation_weighting
+        self.engine.rotation.favourites = set(self.favourite_sounds)
+        self.audio.mixer.fade_in_ms = self.fade_in_ms
+        self.audio.mixer.fade_out_ms = self.fade_out_ms
+        self.audio.mixer.fade_curve = self.fade_curve
 
         # UI
         self._build_ui()
-        if self.frame_id == "running":
-            QTimer.singleShot(100, self.set_alarms)
-
-        # next alarm countdown timer
-        self.next_timer = QTimer(self)
-        self.next_timer.timeout.connect(self._update_next_countdown)
-        self.next_timer.start(1000)
+        # session labels are only written when their text changes
+        self.session_view = SessionView(self.engine)
+        self.session_view.bind("prev_alarm", self.prev_alarm_lbl.setText)
+        self.session_view.bind("next_alarm", self.next_alarm_lbl.setText)
+        self.session_view.bind("countdown_to_next", self.countdown_to_next.setText)
+        self.session_view.bind("ringing", self.countdown_lbl.setText)
+        self.session_view.bind("passed", self.alarm_list_model.rows.set_passed)
+
+        # session labels (display only), on the frame clock while a session is active
+        self.frame_clock.subscribe("session", self._update_next_countdown)
+
+        # single-shot timer re-armed for the earliest pending deadline
+        self._scheduler_timer = QTimer(self)
+        self._scheduler_timer.setSingleShot(True)
+        self._scheduler_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._scheduler_timer.timeout.connect(self._scheduler_tick)
 
     def _defaults(self):
         self.start_hour, self.start_minute, self.start_second, self.start_ampm = 6, 0, 0, "AM"
@@ -154,27 +321,35 @@ class IntervalAlarmApp(QMainWindow):
         self.alarm_length_minutes = 0
         self.alarm_length_seconds = 10
         self.arbitrary_integer = 0
+        self.rotation_weighting = None
+        self.favourite_sounds = []
+        self.fade_in_ms = FADE_IN_MS
+        self.fade_out_ms = FADE_OUT_MS
+        self.fade_curve = "linear"
 
     def _load_settings_min(self):
         try:
-            if os.path.exists(SETTINGS_FILE):
-                with open(SETTINGS_FILE, "r") as f:
-                    s = json.load(f)
-                self.start_hour = int(s.get("start_hour", self.start_hour))
-                self.start_minute = int(s.get("start_minute", self.start_minute))
-                self.start_second = int(s.get("start_second", self.start_second))
-                self.start_ampm = s.get("start_ampm", self.start_ampm)
-                self.end_hour = int(s.get("end_hour", self.end_hour))
-                self.end_minute = int(s.get("end_minute", self.end_minute))
-                self.end_second = int(s.get("end_second", self.end_second))
-                self.end_ampm = s.get("end_ampm", self.end_ampm)
-                self.num_alarms = int(s.get("num_alarms", self.num_alarms))
-                self.sound_folder = s.get("sound_folder", self.sound_folder)
-                self.alarm_length_minutes = int(s.get("alarm_length_minutes", self.alarm_length_minutes))
-                self.alarm_length_seconds = int(s.get("alarm_length_seconds", self.alarm_length_seconds))
-                self.saved_alarm_check_statuses = s.get("alarm_check_statuses", [])
-                self.arbitrary_integer = int(s.get("arbitrary_integer", 0))
-                self.frame_id = s.get("frame_id", "load")
+            s = self.settings_store.load()
+            self.start_hour = int(s.get("start_hour", self.start_hour))
+            self.start_minute = int(s.get("start_minute", self.start_minute))
+            self.start_second = int(s.get("start_second", self.start_second))
+            self.start_ampm = s.get("start_ampm", self.start_ampm)
+            self.end_hour = int(s.get("end_hour", self.end_hour))
+            self.end_minute = int(s.get("end_minute", self.end_minute))
+            self.end_second = int(s.get("end_second", self.end_second))
+            self.end_ampm = s.get("end_ampm", self.end_ampm)
+            self.num_alarms = int(s.get("num_alarms", self.num_alarms))
+            self.sound_folder = s.get("sound_folder", self.sound_folder)
+            self.alarm_length_minutes = int(s.get("alarm_length_minutes", self.alarm_length_minutes))
+            self.alarm_length_seconds = int(s.get("alarm_length_seconds", self.alarm_length_seconds))
+            self.saved_alarm_check_statuses = s.get("alarm_check_statuses", [])
+            self.arbitrary_integer = int(s.get("arbitrary_integer", 0))
+            self.rotation_weighting = s.get("rotation_weighting", self.rotation_weighting)
+            self.favourite_sounds = list(s.get("favourite_sounds", self.favourite_sounds))
+            self.fade_in_ms = int(s.get("fade_in_ms", self.fade_in_ms))
+            self.fade_out_ms = int(s.get("fade_out_ms", self.fade_out_ms))
+            self.fade_curve = s.get("fade_curve", self.fade_curve)
+            self.frame_id = s.get("frame_id", "load")
         except Exception:
             pass
 
@@ -192,16 +367,17 @@ class IntervalAlarmApp(QMainWindow):
             "sound_folder": self.sound_folder,
             "alarm_length_minutes": self.alarm_length_minutes,
             "alarm_length_seconds": self.alarm_length_seconds,
-            "alarm_check_statuses": [cb.isChecked() for cb in self.alarm_check_vars],
+            "alarm_check_statuses": self.alarm_list_model.rows.statuses(),
             "arbitrary_integer": self.arbitrary_spin.value(),
+            "rotation_weighting": self.rotation_weighting,
+            "favourite_sounds": self.favourite_sounds,
+            "fade_in_ms": self.fade_in_ms,
+            "fade_out_ms": self.fade_out_ms,
+            "fade_curve": self.fade_curve,
             "frame_id": self.frame_id,
         }
-        try:
-            os.makedirs(os.path.dirname(SETTINGS_FILE), exist_ok=True)
-            with open(SETTINGS_FILE, "w") as f:
-                json.dump(s, f)
-        except Exception as e:
-            print(f"Error saving settings: {e}")
+        # Written (coalesced) by the store's thread, not here
+        self.settings_store.save(s)
 
     def _format_time(self, h, m, s, ap):
         return f"{h:02}:{m:02}:{s:02} {ap}"
@@ -209,13 +385,6 @@ class IntervalAlarmApp(QMainWindow):
     def _format_len(self, m, s):
         return f"{m}m {s}s"
 
-    def _hms_ampm_to_24(self, h, m, s, ap):
-        if ap == "PM" and h != 12:
-            h += 12
-        elif ap == "AM" and h == 12:
-            h = 0
-        return h, m, s
-
     def _build_ui(self):
         central = QWidget(self)
         outer = QVBoxLayout(central)
@@ -252,7 +421,7 @@ class IntervalAlarmApp(QMainWindow):
         r += 1
 
         grid.addWidget(QLabel("🎵"), r, 0)
-        self.folder_lbl = ScrollingLabel(self.sound_folder or "-", width_chars=30)
+        self.folder_lbl = ScrollingLabel(self.sound_folder or "-", self.frame_clock, width_chars=30)
         grid.addWidget(self.folder_lbl, r, 1)
         btn4 = QPushButton("📁")
         btn4.clicked.connect(self.edit_folder)
@@ -279,7 +448,7 @@ class IntervalAlarmApp(QMainWindow):
         rg = QGridLayout(self.running_panel)
 
         row = 0
-        self.next_file_lbl = ScrollingLabel("", width_chars=40)
+        self.next_file_lbl = ScrollingLabel("", self.frame_clock, width_chars=40)
         rg.addWidget(self.next_file_lbl, row, 0, 2, 5)
         row += 2
 
@@ -294,6 +463,10 @@ class IntervalAlarmApp(QMainWindow):
         self.random_btn = QPushButton("🔀")
         self.random_btn.clicked.connect(self.randomize_next_sound)
         rg.addWidget(self.random_btn, row, 4)
+
+        self.stats_btn = QPushButton("📊")
+        self.stats_btn.clicked.connect(self.show_latency_stats)
+        rg.addWidget(self.stats_btn, row, 3)
         row += 1
 
         self.countdown_to_next = QLabel("")
@@ -318,13 +491,11 @@ class IntervalAlarmApp(QMainWindow):
         rg.addWidget(self.toggle_alarms_btn, row, 0, 1, 2)
         row += 1
 
-        # Alarms area
-        self.alarms_area = QScrollArea()
-        self.alarms_area.setWidgetResizable(True)
-        self.alarms_inner = QWidget()
-        self.alarms_v = QVBoxLayout(self.alarms_inner)
-        self.alarms_inner.setLayout(self.alarms_v)
-        self.alarms_area.setWidget(self.alarms_inner)
+        # Alarms area: a model-backed list, rows are painted only while in view
+        self.alarms_area = QListView()
+        self.alarms_area.setModel(self.alarm_list_model)
+        self.alarms_area.setUniformItemSizes(True)
+        self.alarms_area.setSelectionMode(QListView.SelectionMode.NoSelection)
         self.alarms_area.hide()
         rg.addWidget(self.alarms_area, row, 0, 1, 3)
         row += 1
@@ -342,21 +513,106 @@ class IntervalAlarmApp(QMainWindow):
 
         outer.addWidget(self.running_panel)
 
-        # icon
-        try:
-            ico_file = os.path.join(script_dir, "icon.png")
-            if os.path.exists(ico_file):
-                self.setWindowIcon(QIcon(ico_file))
-        except Exception:
-            pass
+        # icon: pre-scaled sizes only; the full-size icon.png is never decoded before first paint
+        self.has_icon = self._set_window_icon()
+
+    def start_warm_up(self, timer=None, on_done=None):
+        """Called once the window has been drawn: mixer init, library scan and loudness in the background.
+
+        on_done(errors) runs on the GUI thread when it finishes; returning True
+        means it closed the window.
+        """
+        # Queued now so the mixer is initialised before any test play the user can click
+        mixer_ready = self.audio.mixer.init_mixer()
+        steps = [("mixer", mixer_ready.result)]
+        folder = self.sound_folder
+        if folder and os.path.isdir(folder):
+            steps.append(("library", lambda: self.library.refresh(folder)))
+            steps.append(("loudness", lambda: self.loudness_analyzer.request(folder)))
+        if not self.has_icon:
+            steps.append(("icons", lambda: ensure_icons(SOURCE_ICON, data_path("icons"))))
+        self.warm_up_done = on_done
+        self.warm_up = WarmUp(steps, timer)
+        self.warm_up.done.add_done_callback(lambda f: self.warmed_up.emit(f.result()))
+        self.warm_up.start()
+
+    def _on_warmed_up(self, errors):
+        if self.warm_up_done is not None and self.warm_up_done(errors):
+            return  # the window was closed
+        if errors["mixer"] is not None:
+            QMessageBox.critical(self, "Audio Error", f"Pygame mixer initialization failed:\n{errors['mixer']}")
+            sys.exit(1)
+        if not self.has_icon:
+            self.has_icon = self._set_window_icon()
+            if not self.has_icon and os.path.exists(SOURCE_ICON):
+                # No Pillow to scale it: the full-size icon, now that startup is out of the way
+                self.setWindowIcon(QIcon(SOURCE_ICON))
+                self.has_icon = True
+        if self.frame_id == "running" and not self.is_running:
+            self.set_alarms()
+
+    def _set_window_icon(self):
+        paths = icon_paths(cache_dir=data_path("icons"))
+        if not paths:
+            return False
+        icon = QIcon()
+        for p in paths:
+            icon.addFile(p)
+        self.setWindowIcon(icon)
+        return True
+
+    # Frame clock host: the one single-shot QTimer, restarted for each armed tick
+    def _call_later(self, delay_ms, fn):
+        self._frame_fn = fn
+        self._frame_timer.start(delay_ms)
+        return self._frame_timer
+
+    def _cancel_later(self, timer):
+        timer.stop()
+
+    def _on_frame_timer(self):
+        if self._frame_fn:
+            self._frame_fn()
+
+    def _update_visibility(self):
+        handle = self.windowHandle()
+        if self.isVisible() and not self.isMinimized() and (handle is None or handle.isExposed()):
+            self.frame_clock.resume()   # redraws everything that changed while hidden
+        else:
+            self.frame_clock.pause()
+
+    def showEvent(self, e):
+        super().showEvent(e)
+        if not self._watching_expose and self.windowHandle() is not None:
+            # occlusion shows up as expose events on the native window
+            self.windowHandle().installEventFilter(self)
+            self._watching_expose = True
+        self._update_visibility()
+
+    def hideEvent(self, e):
+        super().hideEvent(e)
+        self._update_visibility()
+
+    def changeEvent(self, e):
+        super().changeEvent(e)
+        if e.type() == QEvent.Type.WindowStateChange:
+            self._update_visibility()
+
+    def eventFilter(self, obj, e):
+        if obj is self.windowHandle() and e.type() == QEvent.Type.Expose:
+            self._update_visibility()
+        return super().eventFilter(obj, e)
 
     def closeEvent(self, e):
         self.stop_all_alarms(save=False)
+        self.settings_store.close()
+        # Audio before the log: closing it still records playback_ended for the voices it stops
         try:
-            with pygame_lock:
-                pygame.mixer.quit()
+            self.audio.close()
         except Exception:
             pass
+        self.event_log.write("app_closed")
+        self.event_log.close()
         return super().closeEvent(e)
 
     # Dialog helpers
@@ -432,26 +688,24 @@ class IntervalAlarmApp(QMainWindow):
                 pass
             self.caffeinate_process = None
 
-    def set_alarms(self):
-        # validate
+    def set_alarms(self, indexed=False):
+        # validate and schedule
         try:
-            sh, sm, ss = self._hms_ampm_to_24(self.start_hour, self.start_minute, self.start_second, self.start_ampm)
-            eh, em, es = self._hms_ampm_to_24(self.end_hour, self.end_minute, self.end_second, self.end_ampm)
-            start = datetime.combine(datetime.today(), datetime.min.time()).replace(hour=sh, minute=sm, second=ss, microsecond=0)
-            end   = datetime.combine(datetime.today(), datetime.min.time()).replace(hour=eh, minute=em, second=es, microsecond=0)
-            if end <= start:
-                raise ValueError("End time must be after start time.")
-            if self.num_alarms < 2:
-                raise ValueError("At least 2 alarms required.")
-            if not os.path.isdir(self.sound_folder):
-                raise ValueError("Invalid sound folder.")
-            sound_files = [f for f in os.listdir(self.sound_folder) if f.lower().endswith((".mp3", ".wav"))]
+            if self.warm_up is not None:
+                self.warm_up.wait("mixer")
+            start = self.engine.at(self.start_hour, self.start_minute, self.start_second, self.start_ampm)
+            end = self.engine.at(self.end_hour, self.end_minute, self.end_second, self.end_ampm)
+            # An index lookup; the warm-up scan and the folder watcher keep it fresh
+            sound_files = self.library.indexed_files(self.sound_folder)
             if not sound_files:
-                raise ValueError("No mp3 or wav files found in sound folder.")
-            self.sound_files = [os.path.join(self.sound_folder, f) for f in sound_files]
+                if indexed:
+                    raise ValueError("No mp3 or wav files found in sound folder.")
+                self._index_folder_then_set()
+                return
+            if self.rotation_weighting == "length":
+                self.engine.rotation.durations = {f: self.library.duration(f) for f in sound_files}
             duration = self.alarm_length_minutes * 60 + self.alarm_length_seconds
-            if duration < 1:
-                raise ValueError("Alarm duration must be at least 1 second.")
+            self.engine.schedule(start, end, self.num_alarms, duration, sound_files)
         except Exception as e:
             QMessageBox.critical(self, "Input Error", str(e))
             return
@@ -460,37 +714,57 @@ class IntervalAlarmApp(QMainWindow):
         self._save_settings()
         self.alarm_duration_seconds = duration
 
-        total_seconds = (end - start).total_seconds()
-        interval = total_seconds / (self.num_alarms - 1)
-
-        self.alarm_times.clear()
-        for i in range(self.num_alarms):
-            dt = start + timedelta(seconds=interval * i)
-            self.alarm_times.append(dt.time())
-
         # switch panels
         self.setup_panel.hide()
         self.running_panel.show()
 
-        self.countdown_lbl.setText(self._format_seconds(self.alarm_duration_seconds))
+        self.session_view.reset()
         self._start_caffeinate()
         self.is_running = True
-        self.mute_state["muted"] = False
-        self.last_set_time = datetime.now()
-        self.next_sound_file = random.choice(self.sound_files)
-        self._update_next_sound_label()
         self._rebuild_alarms_checklist()
-        # start scheduler loop timer
-        if not hasattr(self, "_scheduler_timer"):
-            self._scheduler_timer = QTimer(self)
-            self._scheduler_timer.timeout.connect(self._scheduler_tick)
-        self._notified = [False] * len(self.alarm_times)
-        self._scheduler_timer.start(1000)
-
-    def _format_seconds(self, secs: int):
-        m = int(secs) // 60
-        s = int(secs) % 60
-        return f"{m:02}:{s:02}" if m > 0 else f"{s:02}"
+        self._start_folder_watcher()
+        self.loudness_analyzer.request(self.sound_folder)
+        self._arm_scheduler_timer()
+        self.frame_clock.wake("session")
+
+    def _index_folder_then_set(self):
+        # A folder never indexed before: scan it off the GUI thread, then Set again
+        if self.indexing:
+            return
+        self.indexing = True
+        folder = self.sound_folder
+
+        def scan():
+            error = None
+            try:
+                self.library.refresh(folder)
+            except Exception as e:
+                error = e
+            self.folder_indexed.emit(folder, error)
+
+        threading.Thread(target=scan, daemon=True).start()
+
+    def _on_folder_indexed(self, folder, error):
+        self.indexing = False
+        if error is not None:
+            QMessageBox.critical(self, "Input Error", str(error))
+        elif folder == self.sound_folder and not self.engine.is_running:
+            self.set_alarms(indexed=True)
+
+    def _start_folder_watcher(self):
+        self._stop_folder_watcher()
+        self.folder_watcher = FolderWatcher(self.library, self.sound_folder, self.library_changed.emit)
+        self.folder_watcher.start(self.engine.sound_files)
+
+    def _stop_folder_watcher(self):
+        if self.folder_watcher:
+            self.folder_watcher.stop()
+            self.folder_watcher = None
+
+    def _on_library_changed(self, added, removed):
+        self.engine.update_sound_files(added, removed)
+        if added:
+            self.loudness_analyzer.request(self.sound_folder)
 
     def toggle_alarms_list(self):
         self.alarms_frame_visible = not self.alarms_frame_visible
@@ -502,190 +776,109 @@ class IntervalAlarmApp(QMainWindow):
             self.alarms_area.hide()
 
     def _rebuild_alarms_checklist(self):
-        # clear
-        while self.alarms_v.count():
-            item = self.alarms_v.takeAt(0)
-            w = item.widget()
-            if w:
-                w.deleteLater()
-        self.alarm_check_vars = []
-
-        if not self.alarm_times:
-            self.alarms_v.addWidget(QLabel("No scheduled alarms."))
-            return
-
-        if len(self.saved_alarm_check_statuses) == len(self.alarm_times):
-            states = self.saved_alarm_check_statuses
-        else:
-            states = [False] * len(self.alarm_times)
-
-        for i, t in enumerate(self.alarm_times):
-            text = f"{i+1:2d}. {t.strftime('%I:%M:%S %p')}"
-            cb = QCheckBox(text)
-            cb.setChecked(states[i])
-            cb.stateChanged.connect(self._save_settings)
-            self.alarms_v.addWidget(cb)
-            self.alarm_check_vars.append(cb)
-        self._save_settings()
+        # saved statuses apply if the alarm count matches
+        self.alarm_list_model.reset(self.engine.alarms, self.saved_alarm_check_statuses)
+        if self.engine.alarms:
+            self._save_settings()
 
-    def _scheduler_tick(self):
+    def _arm_scheduler_timer(self):
+        self._scheduler_timer.stop()
         if not self.is_running:
             return
-        now = datetime.now().replace(microsecond=0)
-
-        # prev/next indicators
-        prev_alarm = None
-        next_alarm = None
-        for t in sorted(self.alarm_times):
-            alarm_dt = datetime.combine(now.date(), t)
-            if alarm_dt <= now:
-                prev_alarm = t
-            elif alarm_dt > now and next_alarm is None:
-                next_alarm = t
-        self.prev_alarm_lbl.setText(f"⬅️ {prev_alarm.strftime('%I:%M:%S %p')}" if prev_alarm else "⬅️ None")
-        self.next_alarm_lbl.setText(f"➡️ {next_alarm.strftime('%I:%M:%S %p')}" if next_alarm else "➡️ None")
-
-        # trigger alarms
-        last_set_delta = self.last_set_time and (datetime.now() - self.last_set_time).total_seconds() < 2
-        for i, t in enumerate(self.alarm_times):
-            alarm_dt = datetime.combine(now.date(), t)
-            if not self._notified[i] and now >= alarm_dt:
-                if last_set_delta:
-                    self._notified[i] = True
-                    continue
-                self._start_alarm(i)
-                self._notified[i] = True
-                self.mute_state["muted"] = False
-                if i + 1 < len(self.alarm_times):
-                    old = self.next_sound_file
-                    choices = [f for f in self.sound_files if f != old]
-                    self.next_sound_file = random.choice(choices) if choices else old
-                    self._update_next_sound_label()
-                else:
-                    self.next_sound_file = None
-                    self._update_next_sound_label()
-        # countdown-to-next updated by _update_next_countdown()
-
-    def _update_next_countdown(self):
-        if not self.is_running:
-            self.countdown_to_next.setText("")
-            return
-        now = datetime.now().replace(microsecond=0)
-        next_alarm = None
-        for t in sorted(self.alarm_times):
-            alarm_dt = datetime.combine(now.date(), t)
-            if alarm_dt > now:
-                next_alarm = t
-                break
-        if next_alarm:
-            next_dt = datetime.combine(now.date(), next_alarm)
-            remaining = (next_dt - now).total_seconds()
-            if remaining < 0:
-                remaining = 0
-            hours = int(remaining) // 3600
-            minutes = (int(remaining) % 3600) // 60
-            seconds = int(remaining) % 60
-            if hours > 0:
-                text = f"⌛ {hours}:{minutes:02}:{seconds:02}"
-            else:
-                text = f"⌛ {minutes:02}:{seconds:02}"
-        else:
-            text = ""
-        self.countdown_to_next.setText(text)
+        wait = self.engine.seconds_until_next()
+        if wait is not None:
+            self._scheduler_timer.start(math.ceil(wait * 1000))
 
-    def _start_alarm(self, idx):
-        # only one at a time
-        if self.current_worker is not None:
+    def _scheduler_tick(self):
+        if not self.is_running:
             return
+        self.engine.poll()
+        self.frame_clock.wake("session")
+        self._arm_scheduler_timer()
 
-        file_path = self.next_sound_file if self.next_sound_file else random.choice(self.sound_files)
-        self.current_worker = AlarmWorker(file_path, self.alarm_duration_seconds, self.mute_state)
-
-        # wire signals
-        self.current_worker.tick.connect(self._on_alarm_tick)
-        self.current_worker.finished.connect(self._on_alarm_finished)
-        self.current_worker.started.connect(lambda: None)
-        self.current_worker.error.connect(self._on_alarm_error)
-
-        # launch in Python thread (Qt threads also possible)
-        self.current_thread = threading.Thread(target=self.current_worker.run, daemon=True)
-        self.current_thread.start()
-
-    def _on_alarm_tick(self, remaining):
-        if remaining > 0:
-            self.countdown_lbl.setText(self._format_seconds(remaining))
-        else:
-            self.countdown_lbl.setText(self._format_seconds(self.alarm_duration_seconds))
-
-    def _on_alarm_finished(self):
-        self.mute_state["muted"] = False
-        self.current_worker = None
-        self.current_thread = None
+    def _update_next_countdown(self, now=None):
+        # ringing time comes from the playback deadline; back just after the next displayed second rolls over
+        if not self.is_running:
+            return None
+        self.session_view.refresh()
+        return self.session_view.next_refresh_ns()
 
     def _on_alarm_error(self, msg):
         QMessageBox.critical(self, "Playback Error", msg)
-        self.current_worker = None
-        self.current_thread = None
 
-    def _update_next_sound_label(self):
-        if self.next_sound_file:
-            self.next_file_lbl.set_text(os.path.basename(self.next_sound_file))
+    def _update_next_sound_label(self, next_sound_file=None):
+        if next_sound_file:
+            self.next_file_lbl.set_text(os.path.basename(next_sound_file))
         else:
             self.next_file_lbl.set_text("")
 
     def randomize_next_sound(self):
-        if not self.sound_files:
+        if not self.engine.sound_files:
             QMessageBox.critical(self, "No Sounds", "No sound files loaded for alarms.")
             return
-        old = self.next_sound_file
-        choices = [f for f in self.sound_files if f != old]
-        self.next_sound_file = random.choice(choices) if choices else old
-        self._update_next_sound_label()
+        self.engine.randomize_next_sound()
+
+    def show_latency_stats(self):
+        # how late each stage of alarm start-up ran against the schedule this session
+        box = QMessageBox(self)
+        box.setWindowTitle("Trigger latency")
+        box.setTextFormat(Qt.TextFormat.RichText)
+        box.setText(f"<pre>{self.engine.latency.format_table()}</pre>")
+        box.exec()
 
     def toggle_mute(self):
-        self.mute_state["muted"] = not self.mute_state.get("muted", False)
-        self.mute_btn.setText("🔈 Unmute" if self.mute_state["muted"] else "🔇 Mute")
+        muted = self.engine.toggle_mute()
+        self.mute_btn.setText("🔈 Unmute" if muted else "🔇 Mute")
 
     def stop_all_alarms(self, save=True):
         self.is_running = False
-        if self.current_worker:
-            self.current_worker.stop()
+        self.engine.stop()
+        if self.engine.latency.traces:
+            self.engine.latency.dump(data_path("latency.json"))
+        self._stop_folder_watcher()
         self._stop_caffeinate()
         self.running_panel.hide()
         self.setup_panel.show()
         self.mute_btn.setText("🔇 Mute")
-        self.countdown_lbl.setText(self._format_seconds(self.alarm_duration_seconds))
+        self.session_view.reset()
         self.next_file_lbl.set_text("")
-        self.alarm_times.clear()
-        self.prev_alarm_lbl.setText("⬅️ None")
-        self.next_alarm_lbl.setText("➡️ None")
-        self.countdown_to_next.setText("")
-        self.next_sound_file = None
-        self.mute_state["muted"] = False
         self.alarms_area.hide()
         self.alarms_frame_visible = False
         self.toggle_alarms_btn.setText("▼ Scheduled Sessions 🕗")
         self.frame_id = "setting"
-        if hasattr(self, "_scheduler_timer"):
-            self._scheduler_timer.stop()
+        self._scheduler_timer.stop()
         if save:
             self._save_settings()
 
     def trigger_alarm_now(self):
-        global global_start_time
-        global_start_time = time.time()
-        if self.current_worker is not None:
+        if self.engine.ringing_index is not None:
             QMessageBox.information(self, "Alarm Running", "An alarm is already playing.")
             return
-        if not self.sound_files:
+        if not self.engine.sound_files:
             QMessageBox.critical(self, "No Sounds", "No sound files loaded for alarms.")
             return
-        self._start_alarm(-1)
+        self.engine.trigger(-1)
 
 
 if __name__ == "__main__":
+    timer = StartupTimer(launch_time)
+    timer.mark("imports")
     app = QApplication(sys.argv)
     w = IntervalAlarmApp()
     w.resize(700, 520)
+    timer.mark("window")
     w.show()
+
+    def on_warm_up_done(errors):
+        timer.report(w.event_log)
+        if benchmarking():
+            w.close()
+            return True
+
+    def on_first_paint():
+        timer.mark("first_paint")
+        w.start_warm_up(timer, on_warm_up_done)
+
+    # Runs on the event loop's first pass, after the show() paint has been processed
+    QTimer.singleShot(0, on_first_paint)
     sys.exit(app.exec())
@@ -0,0 +1 @@
+# Shared, toolkit-independent pieces used by both ZenSamaya front-ends.
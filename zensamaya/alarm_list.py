@@ -0,0 +1,77 @@
+from .schedule import Bitset, Schedule
+
+
+class AlarmListModel:
+    """Rows of the scheduled-sessions list: a label, a checked flag and a passed flag per alarm.
+
+    Toolkit-independent, so a view can be virtual: it asks for only the rows
+    it is showing, and labels are formatted on first request and cached.
+    Views listen through on_reset() (a new schedule) and
+    on_rows_changed(first, last) (rows checked or passed, to redraw in place).
+    Alarms are in schedule order, so "passed" is a prefix of the list; the
+    checked flags are a Bitset, saved by statuses() as a short string.
+    """
+
+    def __init__(self):
+        self.schedule = Schedule()
+        self.checked = Bitset()
+        self.passed_count = 0
+        self._labels = {}
+        self.on_reset = None
+        self.on_rows_changed = None
+
+    def __len__(self):
+        return len(self.schedule)
+
+    def reset(self, schedule=None, checked=None):
+        """New schedule (the engine's alarms, None for none); checked is the saved statuses, used only if there is one per alarm."""
+        self.schedule = schedule if schedule is not None else Schedule()
+        self.checked = None if checked is None else Bitset.loads(checked, len(self.schedule))
+        if self.checked is None:
+            self.checked = Bitset(len(self.schedule))
+        self.passed_count = 0
+        self._labels = {}
+        if self.on_reset:
+            self.on_reset()
+
+    def label(self, i):
+        text = self._labels.get(i)
+        if text is None:
+            text = self._labels[i] = f"{i+1:2d}. {self.schedule.time(i).strftime('%I:%M:%S %p')}"
+        return text
+
+    def is_checked(self, i):
+        return self.checked[i]
+
+    def is_passed(self, i):
+        return i < self.passed_count
+
+    def set_checked(self, i, value):
+        """Returns whether anything changed."""
+        value = bool(value)
+        if self.checked[i] == value:
+            return False
+        self.checked[i] = value
+        self._changed(i, i)
+        return True
+
+    def toggle(self, i):
+        self.set_checked(i, not self.checked[i])
+        return self.checked[i]
+
+    def set_passed(self, count):
+        """Mark the first count alarms as passed, e.g. prev_index + 1 from AlarmEngine.status()."""
+        count = max(0, min(count, len(self.schedule)))
+        if count == self.passed_count:
+            return
+        first, last = sorted((self.passed_count, count))
+        self.passed_count = count
+        self._changed(first, last - 1)
+
+    def statuses(self):
+        """The checked flags for the settings file; reset() takes this (or a plain list of bools) back."""
+        return self.checked.dumps()
+
+    def _changed(self, first, last):
+        if self.on_rows_changed:
+            self.on_rows_changed(first, last)
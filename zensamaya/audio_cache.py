@@ -0,0 +1,97 @@
+import collections
+import queue
+import threading
+
+DEFAULT_BUDGET_BYTES = 128 * 1024 * 1024
+
+
+def sound_nbytes(sound):
+    """Decoded size of a pygame Sound, worked out without copying its buffer."""
+    import pygame
+    freq, fmt, channels = pygame.mixer.get_init()
+    return int(sound.get_length() * freq) * channels * (abs(fmt) // 8)
+
+
+class SoundCache:
+    """Decodes upcoming alarm tracks on a background thread so playback can start from memory.
+
+    loader turns a path into a decoded object (pygame.mixer.Sound in the apps)
+    and size_of reports its size in bytes. Decoded tracks are kept in LRU
+    order until they exceed budget_bytes; a track bigger than the whole budget
+    is never cached and callers fall back to streaming it. filler(path), if
+    given, is run by fill(path) on the same thread for tracks that should be
+    prepared (e.g. decoded to a disk cache) without being kept in memory.
+    """
+
+    def __init__(self, loader, size_of=len, budget_bytes=DEFAULT_BUDGET_BYTES, filler=None):
+        self._loader = loader
+        self._filler = filler
+        self._size_of = size_of
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self._entries = collections.OrderedDict()   # path -> (decoded, nbytes)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def prefetch(self, path):
+        """Queue path for decoding unless it is already cached or queued."""
+        self._enqueue(path, True)
+
+    def fill(self, path):
+        """Queue filler(path) unless path is already queued; nothing is kept here."""
+        if self._filler is not None:
+            self._enqueue(path, False)
+
+    def get(self, path):
+        """Decoded track for path, or None if it isn't ready (never blocks on a decode)."""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            self._entries.move_to_end(path)
+            return entry[0]
+
+    def discard(self, path):
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self.used_bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
+
+    def _enqueue(self, path, keep):
+        with self._lock:
+            if path in self._entries or path in self._pending:
+                return
+            self._pending.add(path)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, daemon=True)
+                self._thread.start()
+        self._queue.put((path, keep))
+
+    def _worker(self):
+        while True:
+            path, keep = self._queue.get()
+            decoded = None
+            try:
+                if keep:
+                    decoded = self._loader(path)
+                    nbytes = self._size_of(decoded)
+                else:
+                    self._filler(path)
+            except Exception:
+                decoded = None
+            with self._lock:
+                self._pending.discard(path)
+                if decoded is None or nbytes > self.budget_bytes:
+                    continue
+                self._entries[path] = (decoded, nbytes)
+                self.used_bytes += nbytes
+                while self.used_bytes > self.budget_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.used_bytes -= evicted
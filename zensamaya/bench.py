@@ -0,0 +1,138 @@
+"""Scheduler benchmarks on a virtual clock, and app startup timings.
+
+    python -m zensamaya.bench                 # 2, 100 and 10000 alarms
+    python -m zensamaya.bench -n 500 --json   # machine-readable output
+    python -m zensamaya.bench --startup       # import time and time to first paint of both apps
+    python -m zensamaya.bench --startup --entry dist/ZenSamaya/ZenSamaya   # a packaged build
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from .sim import simulate
+from .startup import BENCH_ENV
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ENTRIES = ["ZenSamaya.py", "ZenSamaya_Qt.py"]
+
+
+def bench_scheduler(num_alarms, rounds=5, poll_interval=None):
+    poll_interval_ns = int(poll_interval * 1e9) if poll_interval else None
+    results = [simulate(num_alarms, poll_interval_ns=poll_interval_ns) for _ in range(rounds)]
+    cpu = [r.cpu_per_alarm * 1e6 for r in results]
+    last = results[-1]
+    return {
+        "alarms": num_alarms,
+        "mode": f"poll {poll_interval}s" if poll_interval else "cursor",
+        "rounds": rounds,
+        "fired": last.fired,
+        "wakeups_per_sim_hour": round(last.wakeups_per_hour, 2),
+        "cpu_us_per_alarm_min": round(min(cpu), 2),
+        "cpu_us_per_alarm_mean": round(statistics.mean(cpu), 2),
+        "cpu_us_per_alarm_max": round(max(cpu), 2),
+        "jitter_ms_p50": round(last.lateness_percentile(50) / 1e6, 3),
+        "jitter_ms_p99": round(last.lateness_percentile(99) / 1e6, 3),
+        "jitter_ms_max": round(max(last.lateness, default=0) / 1e6, 3),
+        "wall_ms": round(last.wall_seconds * 1000, 2),
+    }
+
+
+def _import_ms(script):
+    """Milliseconds to import an entry script as a module in a fresh interpreter (no window)."""
+    module = os.path.splitext(os.path.basename(script))[0]
+    code = f"import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(script)),
+                         capture_output=True, text=True, timeout=60)
+    if out.returncode:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "import failed")
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _launch_marks(entry, timeout):
+    """Launch entry with BENCH_ENV set: its startup marks, plus wall_ms until the process exited."""
+    cmd = [sys.executable, entry] if entry.endswith(".py") else [entry]
+    env = dict(os.environ, **{BENCH_ENV: "1"})
+    t = time.perf_counter()
+    out = subprocess.run(cmd, cwd=os.path.dirname(os.path.abspath(entry)), env=env,
+                         capture_output=True, text=True, timeout=timeout)
+    wall_ms = (time.perf_counter() - t) * 1000
+    for line in reversed(out.stdout.splitlines()):
+        if line.startswith("{"):
+            marks = json.loads(line)
+            marks["wall_ms"] = round(wall_ms, 2)
+            return marks
+    raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "no startup marks printed")
+
+
+def bench_startup(entry, rounds=3, timeout=60):
+    """Cold-start timings for one entry point (a script, or a packaged executable).
+
+    import_ms is measured for scripts only. The rest come from the app's own
+    StartupTimer: imports, window (widgets built), first_paint and mixer
+    (warm-up done initialising audio), all from the top of the script, and
+    wall_ms until the benchmarked app had quit again. Each is the median over
+    rounds launches.
+    """
+    row = {"entry": os.path.basename(entry), "rounds": rounds}
+    try:
+        if entry.endswith(".py"):
+            row["import_ms"] = round(statistics.median(_import_ms(entry) for _ in range(rounds)), 2)
+        launches = [_launch_marks(entry, timeout) for _ in range(rounds)]
+    except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+        row["error"] = str(e)
+        return row
+    for key in ("imports", "window", "first_paint", "mixer", "wall_ms"):
+        values = [m[key] for m in launches if key in m]
+        if values:
+            row[key if key == "wall_ms" else f"{key}_ms"] = round(statistics.median(values), 2)
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--alarms", type=int, nargs="+", default=[2, 100, 10000])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--legacy", action="store_true", help="also run the 1 s polling model for comparison")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--startup", action="store_true", help="time app cold start instead of the scheduler")
+    parser.add_argument("--entry", nargs="+", help="scripts or packaged executables for --startup")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        entries = args.entry or [os.path.join(REPO_DIR, e) for e in DEFAULT_ENTRIES]
+        rows = [bench_startup(e, args.rounds) for e in entries]
+        if args.json:
+            print(json.dumps(rows, indent=2))
+            return
+        cols = ["entry", "import_ms", "imports_ms", "window_ms", "first_paint_ms", "mixer_ms", "wall_ms", "error"]
+        cols = [c for c in cols if any(c in row for row in rows)]
+        widths = {c: max(len(c), *(len(str(row.get(c, "-"))) for row in rows)) for c in cols}
+        print("  ".join(c.rjust(widths[c]) for c in cols))
+        for row in rows:
+            print("  ".join(str(row.get(c, "-")).rjust(widths[c]) for c in cols))
+        return
+
+    rows = []
+    for n in args.alarms:
+        rows.append(bench_scheduler(n, args.rounds))
+        if args.legacy:
+            rows.append(bench_scheduler(n, args.rounds, poll_interval=1.0))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    cols = ["alarms", "mode", "fired", "wakeups_per_sim_hour", "cpu_us_per_alarm_min",
+            "cpu_us_per_alarm_mean", "jitter_ms_p50", "jitter_ms_p99", "jitter_ms_max", "wall_ms"]
+    widths = {c: max(len(c), *(len(str(row[c])) for row in rows)) for c in cols}
+    print("  ".join(c.rjust(widths[c]) for c in cols))
+    for row in rows:
+        print("  ".join(str(row[c]).rjust(widths[c]) for c in cols))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from .latency import LatencyRecorder
+from .rotation import ShuffleBag
+from .schedule import Schedule
+from .scheduler import DeadlineScheduler
+
+SOUND_EXTENSIONS = ('.mp3', '.wav')
+# Alarms already due this soon after Set are skipped rather than rung
+SET_GRACE_SECONDS = 2
+NS_PER_SECOND = 1_000_000_000
+# The monotonic clock falling this far behind wall time means the machine slept
+CLOCK_JUMP_SECONDS = 2
+# Longest the scheduler waits without checking for that
+CLOCK_CHECK_SECONDS = 30
+
+
+class SystemClock:
+    """Real clocks; swap for a fake one to run the engine headless.
+
+    Wall time is only read when a session is scheduled; every deadline after
+    that lives on the monotonic clock so NTP slews and DST changes can't
+    make an alarm fire twice or not at all. The monotonic clock stops while
+    the machine is suspended, though, so the engine re-anchors when it falls
+    behind wall time (see AlarmEngine.check_clock).
+    """
+
+    def time_ns(self):
+        return time.time_ns()
+
+    def monotonic_ns(self):
+        return time.monotonic_ns()
+
+
+class NullAudio:
+    """Audio backend that plays nothing and finishes immediately."""
+
+    def __init__(self):
+        self.played = []
+        self.playing_until_ns = None
+
+    def play(self, file_path, duration, mute_state, on_finished, start_ns=None, trace=None):
+        self.played.append(file_path)
+        on_finished()
+
+    def preload(self, file_path):
+        pass
+
+    def set_muted(self, muted):
+        pass
+
+    def forget(self, file_path):
+        pass
+
+    def stop(self):
+        pass
+
+
+def to_24h(hour, ampm):
+    if ampm == 'PM' and hour != 12:
+        return hour + 12
+    if ampm == 'AM' and hour == 12:
+        return 0
+    return hour
+
+
+def build_schedule(start, end, num_alarms):
+    """Return num_alarms datetimes evenly spaced from start to end inclusive."""
+    interval_seconds = (end - start).total_seconds() / (num_alarms - 1)
+    return [start + timedelta(seconds=interval_seconds * i) for i in range(num_alarms)]
+
+
+class AlarmEngine:
+    """Schedule, trigger detection, sound rotation and mute state without any UI.
+
+    The audio backend needs play(file_path, duration, mute_state, on_finished,
+    start_ns, trace), set_muted(muted), preload(file_path), forget(file_path) and stop();
+    on_finished must be called once playback is over, mute_state is only the
+    starting mute and later changes arrive through set_muted, start_ns is the
+    alarm's scheduled monotonic deadline (None when triggered by hand) for
+    backends that want to end it on schedule, trace is a latency.TriggerTrace
+    (or None) to mark playback stages on, preload is a
+    hint that file_path is the next track and forget says it is gone from
+    disk. A scheduled alarm can come due while the last one is still
+    sounding: play() is then called again and the backend should take over
+    from (e.g. crossfade out) the earlier play, whose on_finished still comes
+    when it ends; each on_finished belongs to its own play(). Front-ends
+    either call run_in_thread() or drive poll() from their own timer, and get
+    told about changes through the on_* hooks, which run on whichever thread
+    drives the engine. With an event_log (see eventlog.EventLog) each alarm
+    is recorded with its scheduled and actual monotonic times.
+    """
+
+    def __init__(self, audio=None, clock=None, rotation=None, event_log=None):
+        self.audio = audio if audio is not None else NullAudio()
+        self.clock = clock if clock is not None else SystemClock()
+        self.rotation = rotation if rotation is not None else ShuffleBag()
+        self.event_log = event_log
+        self.latency = LatencyRecorder()
+        self.scheduler = DeadlineScheduler(clock=self.clock.monotonic_ns,
+                                           max_wait_ns=CLOCK_CHECK_SECONDS * NS_PER_SECOND,
+                                           on_wake=self.check_clock)
+        self.alarms = Schedule()
+        self.alarm_duration_seconds = 0
+        self.sound_files = []
+        self.next_sound_file = None
+        self.mute_state = {'muted': False}
+        self.ringing_index = None
+        self._ringing_token = None      # which play() the ringing_index belongs to
+        self.is_running = False
+        self.last_set_time = None
+        self._lock = threading.Lock()
+
+        self.on_next_sound_changed = None   # (file_path or None)
+        self.on_alarm_started = None        # (index, file_path)
+        self.on_alarm_finished = None       # (index)
+
+    def at(self, hour, minute, second, ampm):
+        """Datetime for a 12-hour clock reading on the engine clock's current day."""
+        today = datetime.fromtimestamp(self.clock.time_ns() / NS_PER_SECOND).date()
+        return datetime.combine(today, datetime.min.time()).replace(
+            hour=to_24h(hour, ampm), minute=minute, second=second)
+
+    def schedule(self, start, end, num_alarms, duration_seconds, sound_files):
+        """Validate the inputs and arm a new session; raises ValueError on bad input."""
+        if end <= start:
+            raise ValueError("End time must be after start time.")
+        if num_alarms < 2:
+            raise ValueError("At least 2 alarms required.")
+        if not sound_files:
+            raise ValueError("No mp3 or wav files found in sound folder.")
+        if duration_seconds < 1:
+            raise ValueError("Alarm duration must be at least 1 second.")
+
+        times = build_schedule(start, end, num_alarms)
+        # Anchor wall time to the monotonic clock once, here
+        wall_ns = self.clock.time_ns()
+        mono_ns = self.clock.monotonic_ns()
+        self.alarms = Schedule.from_datetimes(times, wall_ns, mono_ns)
+        self.alarm_duration_seconds = duration_seconds
+        self.sound_files = list(sound_files)
+        self.mute_state['muted'] = False
+        self.ringing_index = None
+        self._ringing_token = None
+        self.is_running = True
+        self.last_set_time = mono_ns
+        self.latency.reset()
+        self.scheduler.arm(self.alarms.monotonic(), skip_before=mono_ns + SET_GRACE_SECONDS * NS_PER_SECOND)
+        self.rotation.set_items(self.sound_files)
+        self._set_next_sound(self.rotation.pick())
+        self._log("session_scheduled", alarms=num_alarms, duration=duration_seconds,
+                  first_ns=self.alarms.mono_ns(0), last_ns=self.alarms.mono_ns(-1))
+        return self.alarms
+
+    def run_in_thread(self):
+        return self.scheduler.start(self._on_due)
+
+    def poll(self, now=None):
+        """Fire every alarm that is due; for hosts that drive the engine from a timer."""
+        self.check_clock()
+        due = self.scheduler.pop_due(now)
+        self._on_due(due)
+        return due
+
+    def seconds_until_next(self, now=None):
+        """Seconds until poll() is next needed, at most CLOCK_CHECK_SECONDS while a session runs."""
+        wait = self.scheduler.seconds_until_next(now)
+        if wait is None or not self.is_running:
+            return wait
+        return min(wait, CLOCK_CHECK_SECONDS)
+
+    def check_clock(self):
+        """Re-anchor the session if the monotonic clock stood still while wall time ran on.
+
+        That happens across a system suspend: without it every alarm would
+        come due late by the length of the sleep. Alarms the sleep skipped
+        over ring once (the latest of them), as soon as this runs. A wall
+        clock set backwards is left alone, so alarms never ring twice.
+        Returns the shift in nanoseconds, 0 when nothing moved.
+        """
+        mono_ns = self.clock.monotonic_ns()
+        offset_ns = mono_ns - self.clock.time_ns()
+        with self._lock:
+            alarms = self.alarms
+            delta_ns = offset_ns - alarms.mono_offset_ns
+            if not self.is_running or delta_ns > -CLOCK_JUMP_SECONDS * NS_PER_SECOND:
+                return 0
+            alarms.mono_offset_ns = offset_ns
+        self.scheduler.shift(delta_ns, mono_ns)
+        self._log("clock_reanchored", shift_ms=delta_ns / 1e6)
+        return delta_ns
+
+    def status(self, now=None):
+        """(prev_index, next_index, whole seconds to next) for countdown displays."""
+        self.check_clock()
+        if now is None:
+            now = self.clock.monotonic_ns()
+        prev_idx, next_idx = self.alarms.prev_next(now)
+        remaining = None
+        if next_idx is not None:
+            remaining = self.alarms.seconds_until(next_idx, now)
+        return prev_idx, next_idx, remaining
+
+    def trigger(self, idx):
+        """Start alarm idx (-1 for a manual trigger).
+
+        A scheduled alarm due while another is ringing takes over from it (the
+        backend crossfades); a manual trigger is refused then, returning False.
+        """
+        token = object()
+        with self._lock:
+            if not self.sound_files or (idx < 0 and self.ringing_index is not None):
+                return False
+            self.ringing_index = idx
+            self._ringing_token = token
+        trace = None
+        if 0 <= idx < len(self.alarms):
+            trace = self.latency.begin(idx, self.alarms.mono_ns(idx), self.clock.monotonic_ns())
+        with self._lock:
+            file_path = self.next_sound_file if self.next_sound_file else self.rotation.pick()
+            self.rotation.mark_played(file_path)
+        self._log("alarm_started", alarm=idx, file=file_path)
+        if self.on_alarm_started:
+            self.on_alarm_started(idx, file_path)
+        start_ns = trace.scheduled_ns if trace else None
+        if trace:
+            trace.mark("dispatched")
+        self.audio.play(file_path, self.alarm_duration_seconds, self.mute_state,
+                        lambda: self._finished(idx, token), start_ns, trace)
+        return True
+
+    def randomize_next_sound(self):
+        with self._lock:
+            if not self.sound_files:
+                return None
+            file_path = self.rotation.pick()
+        self._set_next_sound(file_path)
+        return file_path
+
+    def update_sound_files(self, added, removed):
+        """Apply library changes seen mid-session without rescanning the folder.
+
+        Safe while run_in_thread()'s thread is picking tracks: the rotation is
+        only changed or read under the engine's lock.
+        """
+        removed = set(removed)
+        with self._lock:
+            present = set(self.sound_files)
+            self.sound_files = [f for f in self.sound_files if f not in removed]
+            self.sound_files.extend(f for f in added if f not in present)
+            self.rotation.add(added)
+            self.rotation.remove(removed)
+            replacement = self.rotation.pick() if self.next_sound_file in removed else None
+        for file_path in removed:
+            self.audio.forget(file_path)
+        if self.next_sound_file in removed:
+            self._set_next_sound(replacement)
+
+    def toggle_mute(self):
+        self._set_muted(not self.mute_state['muted'])
+        return self.mute_state['muted']
+
+    def stop(self):
+        if self.is_running:
+            self._log("session_stopped")
+        with self._lock:
+            self.rotation.save()
+        self.is_running = False
+        self.scheduler.stop()
+        self.scheduler.clear()
+        self.audio.stop()
+        self.alarms = Schedule()
+        self.next_sound_file = None
+        self.mute_state['muted'] = False
+        self.ringing_index = None
+        self._ringing_token = None
+
+    def _on_due(self, indices):
+        alarms = self.alarms
+        for i in indices:
+            if not self.is_running:
+                return
+            if self.event_log is not None:
+                now = self.clock.monotonic_ns()
+                self._log("alarm_due", alarm=i, scheduled_ns=alarms.mono_ns(i), actual_ns=now,
+                          late_ms=(now - alarms.mono_ns(i)) / 1e6)
+            self.trigger(i)
+            self._set_muted(False)
+            if i + 1 < len(alarms):
+                self.randomize_next_sound()
+            else:
+                self._set_next_sound(None)
+        if indices:
+            with self._lock:
+                self.rotation.save()
+
+    def _finished(self, idx, token):
+        self._log("alarm_finished", alarm=idx)
+        with self._lock:
+            if token is not self._ringing_token:
+                return      # an earlier alarm fading out under the one ringing now, or one from before stop()
+            self.ringing_index = None
+            self._ringing_token = None
+        self.mute_state['muted'] = False
+        if self.on_alarm_finished:
+            self.on_alarm_finished(idx)
+
+    def _set_muted(self, muted):
+        self.mute_state['muted'] = muted
+        self.audio.set_muted(muted)
+
+    def _log(self, event, **fields):
+        if self.event_log is not None:
+            self.event_log.write(event, **fields)
+
+    def _set_next_sound(self, file_path):
+        self.next_sound_file = file_path
+        if file_path:
+            self.audio.preload(file_path)
+        if self.on_next_sound_changed:
+            self.on_next_sound_changed(file_path)
@@ -0,0 +1,92 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUPS = 3
+
+
+class EventLog:
+    """Append-only JSON-lines event log written by its own thread.
+
+    write() only stamps the record and puts it on a queue, so it never blocks
+    on disk, whichever thread (audio, scheduler, UI) calls it. The writer
+    thread takes whatever has queued up, appends it in one write and flushes,
+    then waits flush_interval before the next batch. Once the file passes
+    max_bytes it is rotated to events.log.1 .. events.log.<backups>, so history
+    survives restarts without growing forever.
+
+    Each record has the wall time, the monotonic time it was logged at and an
+    event type, plus whatever fields the caller adds, e.g. the alarm index and
+    its scheduled vs actual monotonic times.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS, flush_interval=0.5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, event, **fields):
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "mono_ns": time.monotonic_ns(),
+            "event": event,
+        }
+        record.update(fields)
+        self._queue.put(record)
+
+    def message(self, text):
+        self.write("message", message=text)
+
+    def close(self, timeout=2.0):
+        """Write everything still queued and stop the writer thread."""
+        self._closed.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        done = False
+        while not done:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                done = True
+                batch = [r for r in batch if r is not None]
+            if batch:
+                self._append(batch)
+            if not done:
+                self._closed.wait(self.flush_interval)
+
+    def _append(self, records):
+        lines = "".join(json.dumps(r, default=str) + "\n" for r in records)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(lines)
+                size = f.tell()
+            if size > self.max_bytes:
+                self._rotate()
+        except OSError:
+            pass
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
@@ -0,0 +1,115 @@
+import time
+import traceback
+
+NS_PER_SECOND = 1_000_000_000
+# Host timers may fire a little early; anything due this soon counts as due
+SLACK_NS = 1_000_000
+
+
+def until_wall_second_ns(wall_ns=None):
+    """Nanoseconds until the wall clock next ticks over a whole second."""
+    if wall_ns is None:
+        wall_ns = time.time_ns()
+    return NS_PER_SECOND - wall_ns % NS_PER_SECOND
+
+
+class FrameClock:
+    """One host timer shared by every animated and countdown widget in a window.
+
+    Each subscriber is fn(now_ns) -> ns until it next wants calling, or None
+    to go idle until wake(key). The clock keeps a single timer armed for the
+    earliest subscriber due (call_later(delay_ms, tick) -> handle and
+    cancel(handle) are the toolkit's, e.g. Tk's after/after_cancel), so
+    however many widgets animate, the process wakes once per due time.
+
+    pause() (window minimised, hidden or occluded) stops calling subscribers
+    entirely, except those that gave background_ns, which drop to at most one
+    call per background_ns. resume() calls every subscriber at once, a
+    catch-up render of whatever changed while hidden, then carries on.
+    """
+
+    def __init__(self, call_later, cancel, clock=time.monotonic_ns):
+        self._call_later = call_later
+        self._cancel = cancel
+        self._clock = clock
+        self._subs = {}         # key -> [fn, due_ns or None, background_ns or None]
+        self._handle = None
+        self._armed_ns = None
+        self.paused = False
+        self.wakeups = 0
+
+    def subscribe(self, key, fn, delay_ns=0, background_ns=None):
+        self._subs[key] = [fn, None, background_ns]
+        self.wake(key, delay_ns)
+
+    def unsubscribe(self, key):
+        self._subs.pop(key, None)
+
+    def wake(self, key, delay_ns=0):
+        """Have key's subscriber called within delay_ns (sooner if it was already due sooner)."""
+        sub = self._subs.get(key)
+        if sub is None:
+            return
+        due = self._clock() + delay_ns
+        if sub[1] is None or due < sub[1]:
+            sub[1] = due
+        self._arm()
+
+    def pause(self):
+        if self.paused:
+            return
+        self.paused = True
+        self._disarm()
+        self._arm()
+
+    def resume(self):
+        if not self.paused:
+            return
+        self.paused = False
+        now = self._clock()
+        for sub in self._subs.values():
+            sub[1] = now
+        self._disarm()
+        self.tick()
+
+    def tick(self):
+        self._handle = None
+        self._armed_ns = None
+        self.wakeups += 1
+        now = self._clock()
+        for key, sub in list(self._subs.items()):
+            fn, due, background_ns = sub
+            if due is None or due > now + SLACK_NS or (self.paused and background_ns is None):
+                continue
+            if self._subs.get(key) is not sub:
+                continue    # unsubscribed by an earlier callback
+            sub[1] = None
+            try:
+                delay = fn(now)
+            except Exception:
+                traceback.print_exc()   # keep the clock (and every other widget) running
+                delay = None
+            if delay is not None:
+                if self.paused:
+                    delay = max(delay, background_ns)
+                sub[1] = now + delay
+        self._arm()
+
+    def _arm(self):
+        dues = [due for _, due, background_ns in self._subs.values()
+                if due is not None and (not self.paused or background_ns is not None)]
+        if not dues:
+            return
+        target = min(dues)
+        if self._armed_ns is not None and self._armed_ns <= target:
+            return
+        self._disarm()
+        delay_ms = max(0, -(-(target - self._clock()) // 1_000_000))
+        self._armed_ns = target
+        self._handle = self._call_later(delay_ms, self.tick)
+
+    def _disarm(self):
+        if self._handle is not None:
+            self._cancel(self._handle)
+        self._handle = None
+        self._armed_ns = None
@@ -0,0 +1,76 @@
+"""Pre-scaled copies of icon.png, so window creation loads a few KB instead of decoding a 1328 px PNG.
+
+    python -m zensamaya.icons build/icons    # what ZenSamaya.spec runs at build time (needs Pillow)
+"""
+import json
+import os
+import sys
+
+ICON_SIZES = (16, 32, 48, 64, 128)
+STAMP_FILE = "stamp.json"
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_ICON = os.path.join(REPO_DIR, "icon.png")
+
+
+def icon_name(size):
+    return f"icon_{size}.png"
+
+
+def _stamp(src):
+    st = os.stat(src)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sizes": list(ICON_SIZES)}
+
+
+def _complete(icon_dir):
+    return all(os.path.exists(os.path.join(icon_dir, icon_name(size))) for size in ICON_SIZES)
+
+
+def bundled_dir():
+    """Where a packaged build keeps the icons it generated at build time."""
+    return os.path.join(getattr(sys, "_MEIPASS", REPO_DIR), "icons")
+
+
+def build_icons(src, out_dir):
+    """Write src scaled to each of ICON_SIZES into out_dir. Imports Pillow, so keep it off the startup path."""
+    from PIL import Image
+    os.makedirs(out_dir, exist_ok=True)
+    with Image.open(src) as im:
+        im = im.convert("RGBA")
+        for size in ICON_SIZES:
+            path = os.path.join(out_dir, icon_name(size))
+            im.resize((size, size), Image.LANCZOS).save(path + ".tmp", format="PNG", optimize=True)
+            os.replace(path + ".tmp", path)
+    with open(os.path.join(out_dir, STAMP_FILE), "w") as f:
+        json.dump(_stamp(src), f)
+
+
+def icon_paths(src=SOURCE_ICON, cache_dir=None):
+    """Pre-scaled icon files, smallest first, or [] if there are none yet.
+
+    The build-time set wins; otherwise cache_dir is used if it was built from
+    src as it is now. Only file names and a stamp are checked, nothing decoded.
+    """
+    if _complete(bundled_dir()):
+        return [os.path.join(bundled_dir(), icon_name(size)) for size in ICON_SIZES]
+    if cache_dir is None or not _complete(cache_dir):
+        return []
+    try:
+        with open(os.path.join(cache_dir, STAMP_FILE)) as f:
+            if json.load(f) != _stamp(src):
+                return []
+    except (OSError, ValueError):
+        return []
+    return [os.path.join(cache_dir, icon_name(size)) for size in ICON_SIZES]
+
+
+def ensure_icons(src, cache_dir):
+    """Build the cache_dir set if it's missing or stale; a warm-up step. Returns the icon paths."""
+    paths = icon_paths(src, cache_dir)
+    if not paths and os.path.exists(src):
+        build_icons(src, cache_dir)
+        paths = icon_paths(src, cache_dir)
+    return paths
+
+
+if __name__ == "__main__":
+    build_icons(SOURCE_ICON, sys.argv[1] if len(sys.argv) > 1 else bundled_dir())
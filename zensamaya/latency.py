@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+
+STAGES = ("due", "dispatched", "dequeued", "decoded", "audio_out")
+PERCENTILES = (50, 95, 99)
+
+
+class TriggerTrace:
+    """Stage timestamps for one alarm start.
+
+    lateness_ns is how far past its monotonic deadline the alarm was seen to
+    be due; the stages after that are perf_counter_ns readings, so each stage
+    latency is lateness plus the time since "due".
+    """
+
+    __slots__ = ("index", "scheduled_ns", "lateness_ns", "marks")
+
+    def __init__(self, index, scheduled_ns, lateness_ns):
+        self.index = index
+        self.scheduled_ns = scheduled_ns
+        self.lateness_ns = lateness_ns
+        self.marks = {"due": time.perf_counter_ns()}
+
+    def mark(self, stage):
+        self.marks.setdefault(stage, time.perf_counter_ns())
+
+    def latency_ns(self, stage):
+        """Deadline-to-stage latency, or None if the stage wasn't reached."""
+        if stage not in self.marks:
+            return None
+        return self.lateness_ns + self.marks[stage] - self.marks["due"]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class LatencyRecorder:
+    """Per-session trigger latency: scheduled deadline to each playback stage.
+
+    Stages are due (the scheduler saw the deadline), dispatched (the engine
+    handed the alarm to the audio backend), dequeued (the audio thread picked
+    the command up), decoded (the track's PCM or stream was ready) and
+    audio_out (the mixer accepted it for playback; pygame can't report the
+    first sample actually leaving the device).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.traces = []
+
+    def reset(self):
+        with self._lock:
+            self.traces = []
+
+    def begin(self, index, scheduled_ns, now_ns):
+        trace = TriggerTrace(index, scheduled_ns, now_ns - scheduled_ns)
+        with self._lock:
+            self.traces.append(trace)
+        return trace
+
+    def summary(self):
+        """{stage: {"count", "p50_ms", "p95_ms", "p99_ms", "max_ms"}} over this session."""
+        with self._lock:
+            traces = list(self.traces)
+        result = {}
+        for stage in STAGES:
+            values = sorted(v for v in (t.latency_ns(stage) for t in traces) if v is not None)
+            row = {"count": len(values)}
+            for pct in PERCENTILES:
+                value = percentile(values, pct)
+                row[f"p{pct}_ms"] = None if value is None else round(value / 1e6, 3)
+            row["max_ms"] = round(values[-1] / 1e6, 3) if values else None
+            result[stage] = row
+        return result
+
+    def as_dict(self):
+        with self._lock:
+            traces = list(self.traces)
+        return {
+            "summary": self.summary(),
+            "alarms": [
+                {"index": t.index, "scheduled_ns": t.scheduled_ns,
+                 **{f"{stage}_ms": round(t.latency_ns(stage) / 1e6, 3) for stage in STAGES if stage in t.marks}}
+                for t in traces
+            ],
+        }
+
+    def dump(self, path):
+        """Write the session's latencies as JSON for offline analysis."""
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self.as_dict(), f, indent=2)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def format_table(self):
+        """The summary as aligned text, for a stats view."""
+        summary = self.summary()
+        cols = ["stage", "count"] + [f"p{pct}_ms" for pct in PERCENTILES] + ["max_ms"]
+        rows = [[stage] + ["-" if row[c] is None else str(row[c]) for c in cols[1:]] for stage, row in summary.items()]
+        widths = [max(len(c), *(len(r[i]) for r in rows)) for i, c in enumerate(cols)]
+        lines = ["  ".join(c.rjust(w) for c, w in zip(cols, widths))]
+        lines += ["  ".join(v.rjust(w) for v, w in zip(r, widths)) for r in rows]
+        return "\n".join(lines)
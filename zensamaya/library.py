@@ -0,0 +1,255 @@
+import os
+import sqlite3
+import threading
+import wave
+
+from .core import SOUND_EXTENSIONS
+from .loudness import TARGET_LUFS, gain_for
+
+SCHEMA_VERSION = 2
+
+_MPEG1_L3_KBPS = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_MPEG2_L3_KBPS = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+
+
+def _mp3_duration(path):
+    """Duration from the first frame header (and Xing/Info frame count for VBR), no decoding."""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(10)
+        offset = 0
+        if head[:3] == b"ID3" and len(head) == 10:
+            offset = 10 + ((head[6] & 0x7f) << 21 | (head[7] & 0x7f) << 14 | (head[8] & 0x7f) << 7 | (head[9] & 0x7f))
+        f.seek(offset)
+        buf = f.read(64 * 1024)
+    for i in range(len(buf) - 4):
+        if buf[i] != 0xFF or buf[i + 1] & 0xE0 != 0xE0:
+            continue
+        b1, b2, b3 = buf[i + 1], buf[i + 2], buf[i + 3]
+        version = (b1 >> 3) & 3         # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+        layer = (b1 >> 1) & 3           # 1 = Layer III
+        bitrate_idx, rate_idx = b2 >> 4, (b2 >> 2) & 3
+        if version == 1 or layer != 1 or bitrate_idx in (0, 15) or rate_idx == 3:
+            continue
+        mpeg1 = version == 3
+        bitrate = (_MPEG1_L3_KBPS if mpeg1 else _MPEG2_L3_KBPS)[bitrate_idx] * 1000
+        sample_rate = (44100, 48000, 32000)[rate_idx] // {3: 1, 2: 2, 0: 4}[version]
+        mono = (b3 >> 6) == 3
+        side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+        tag = buf[i + 4 + side_info:i + 16 + side_info]
+        if tag[:4] in (b"Xing", b"Info") and int.from_bytes(tag[4:8], "big") & 1:
+            frames = int.from_bytes(tag[8:12], "big")
+            return frames * (1152 if mpeg1 else 576) / sample_rate
+        return (file_size - offset - i) * 8 / bitrate
+    return None
+
+
+def probe_duration(path, fmt):
+    try:
+        if fmt == "wav":
+            with wave.open(path, "rb") as w:
+                return w.getnframes() / w.getframerate()
+        if fmt == "mp3":
+            return _mp3_duration(path)
+    except Exception:
+        pass
+    return None
+
+
+class SoundLibrary:
+    """Persistent index of the sound folder, so Set doesn't have to list it every time.
+
+    Folders are walked recursively with os.scandir. A directory whose mtime is
+    unchanged since the last scan isn't listed again; its known tracks and
+    subdirectories come from the index. Each track row carries format, size
+    and a header-probed duration, plus loudness and peak once a
+    LoudnessAnalyzer has been over it (reset whenever the file changes).
+
+    gain() and duration() are called when an alarm triggers, so they never
+    touch SQLite or wait on a scan: they read an in-memory copy of every
+    track's duration, loudness and peak, rebuilt after each refresh() and
+    analysis batch and swapped in whole.
+    """
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_schema()
+        self._playback = {}         # path -> (duration, loudness, peak)
+        self._quietest = None       # lowest analysed loudness, the normalisation target
+        with self._lock:
+            self._reload_playback_locked(None)
+
+    def _create_schema(self):
+        with self._lock, self._db:
+            if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                self._db.executescript("""
+                    DROP TABLE IF EXISTS dirs;
+                    DROP TABLE IF EXISTS tracks;
+                """)
+            self._db.executescript(f"""
+                CREATE TABLE IF NOT EXISTS dirs (
+                    path TEXT PRIMARY KEY,
+                    parent TEXT,
+                    mtime_ns INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+                CREATE TABLE IF NOT EXISTS tracks (
+                    path TEXT PRIMARY KEY,
+                    dir TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    duration REAL,
+                    loudness REAL,
+                    peak REAL,
+                    analysed INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS tracks_dir ON tracks(dir);
+                PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+
+    def refresh(self, root):
+        """Bring the index for root up to date, only listing directories that changed."""
+        if not root:
+            raise ValueError("Invalid sound folder.")   # abspath would make it the cwd
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            raise ValueError("Invalid sound folder.")
+        with self._lock, self._db:
+            known = dict(self._db.execute(
+                "SELECT path, mtime_ns FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+                (root, len(root) + 1, root + os.sep)))
+            seen = set()
+            stack = [(root, None)]
+            while stack:
+                path, parent = stack.pop()
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(path)
+                if known.get(path) == mtime_ns:
+                    stack.extend((child, path) for (child,) in self._db.execute(
+                        "SELECT path FROM dirs WHERE parent = ?", (path,)))
+                    continue
+                stack.extend((child, path) for child in self._scan_dir(path, parent, mtime_ns))
+            for gone in known.keys() - seen:
+                self._db.execute("DELETE FROM dirs WHERE path = ?", (gone,))
+                self._db.execute("DELETE FROM tracks WHERE dir = ?", (gone,))
+            self._reload_playback_locked(root)
+
+    def _scan_dir(self, path, parent, mtime_ns):
+        known = {p: (size, mtime) for p, size, mtime in self._db.execute(
+            "SELECT path, size, mtime_ns FROM tracks WHERE dir = ?", (path,))}
+        subdirs = []
+        present = set()
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            entries = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                if not entry.name.lower().endswith(SOUND_EXTENSIONS):
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            present.add(entry.path)
+            if known.get(entry.path) == (st.st_size, st.st_mtime_ns):
+                continue
+            fmt = os.path.splitext(entry.name)[1][1:].lower()
+            self._db.execute(
+                "INSERT OR REPLACE INTO tracks (path, dir, format, size, mtime_ns, duration) VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.path, path, fmt, st.st_size, st.st_mtime_ns, probe_duration(entry.path, fmt)))
+        self._db.executemany("DELETE FROM tracks WHERE path = ?", [(p,) for p in known.keys() - present])
+        self._db.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                         (path, parent, mtime_ns))
+        return subdirs
+
+    def tracks(self, root):
+        """Indexed (path, format, size, duration) rows under root, without touching the disk."""
+        root = os.path.abspath(root)
+        with self._lock:
+            return self._db.execute(
+                "SELECT path, format, size, duration FROM tracks WHERE dir = ? OR substr(dir, 1, ?) = ? ORDER BY path",
+                (root, len(root) + 1, root + os.sep)).fetchall()
+
+    def unanalysed(self, root, limit, exclude=()):
+        """Up to limit track paths under root with no loudness analysis yet, leaving out those in exclude."""
+        root = os.path.abspath(root)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path FROM tracks WHERE analysed = 0 AND (dir = ? OR substr(dir, 1, ?) = ?) LIMIT ?",
+                (root, len(root) + 1, root + os.sep, limit + len(exclude)))
+            return [path for path, in rows if path not in exclude][:limit]
+
+    def store_analysis(self, results):
+        """Record (path, loudness, peak) rows for measured tracks; a None loudness means silence."""
+        with self._lock, self._db:
+            self._db.executemany("UPDATE tracks SET loudness = ?, peak = ?, analysed = 1 WHERE path = ?",
+                                 [(loudness, peak, path) for path, loudness, peak in results])
+            playback = dict(self._playback)
+            for path, loudness, peak in results:
+                if path in playback:
+                    playback[path] = (playback[path][0], loudness, peak)
+            self._set_playback(playback)
+
+    def gain(self, path):
+        """Playback gain normalising path's loudness, 1.0 until it has been analysed.
+
+        Tracks are brought down to the quietest analysed track in the library
+        (which plays at 1.0, as the mixer can't amplify), or to TARGET_LUFS if
+        that is quieter still, so normalising never turns alarms right down.
+        """
+        entry = self._playback.get(path)
+        if entry is None:
+            return 1.0
+        quietest = self._quietest
+        return gain_for(entry[1], entry[2], TARGET_LUFS if quietest is None else max(quietest, TARGET_LUFS))
+
+    def duration(self, path):
+        """Indexed duration of path in seconds, or None if unknown."""
+        entry = self._playback.get(path)
+        return entry[0] if entry else None
+
+    def _reload_playback_locked(self, root):
+        """Re-read the playback copy for tracks under root (every track for None)."""
+        if root is None:
+            rows = self._db.execute("SELECT path, duration, loudness, peak FROM tracks")
+            playback = {}
+        else:
+            rows = self._db.execute(
+                "SELECT path, duration, loudness, peak FROM tracks WHERE dir = ? OR substr(dir, 1, ?) = ?",
+                (root, len(root) + 1, root + os.sep))
+            prefix = root + os.sep
+            playback = {p: v for p, v in self._playback.items() if not p.startswith(prefix)}
+        for path, duration, loudness, peak in rows:
+            playback[path] = (duration, loudness, peak)
+        self._set_playback(playback)
+
+    def _set_playback(self, playback):
+        self._quietest = min((v[1] for v in playback.values() if v[1] is not None), default=None)
+        self._playback = playback
+
+    def directories(self, root):
+        root = os.path.abspath(root)
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT path FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+                (root, len(root) + 1, root + os.sep))]
+
+    def indexed_files(self, root):
+        """Track paths under root as last indexed, from memory: no scan and no wait on a running one.
+
+        What Set uses; [] means root hasn't been indexed (or has no tracks),
+        and a refresh() off the UI thread should come first. Raises ValueError
+        for a missing folder.
+        """
+        if not root or not os.path.isdir(root):
+            raise ValueError("Invalid sound folder.")
+        prefix = os.path.join(os.path.abspath(root), "")
+        return sorted(p for p in self._playback if p.startswith(prefix))
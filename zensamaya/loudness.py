@@ -0,0 +1,201 @@
+import math
+import os
+import threading
+
+from .stream import MAX_DECODE_SECONDS
+
+np = None   # NumPy, imported on first use; analysis is skipped without it, playback is unaffected
+_np_checked = False
+
+# Playback level tracks are brought down to; the library lowers it to its quietest track if that's louder
+TARGET_LUFS = -16.0
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+SUBBLOCK_SECONDS = 0.1      # gating blocks are 4 of these (400 ms, 75% overlap)
+CHUNK_SECONDS = 10
+BATCH_SIZE = 16
+
+_SAMPLE_TYPES = {-8: "int8", 8: "uint8", -16: "int16", 16: "uint16", 32: "float32"}
+
+
+def available():
+    global np, _np_checked
+    if not _np_checked:
+        _np_checked = True
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+    return np is not None
+
+
+def _k_weighting_power(freqs, rate):
+    """|H(f)|^2 of the BS.1770 K-weighting filter (shelf then high-pass) at freqs."""
+    # Stage 1: high shelf
+    K = math.tan(math.pi * 1681.974450955533 / rate)
+    Q = 0.7071752369554196
+    Vh = 10 ** (3.999843853973347 / 20)
+    Vb = Vh ** 0.4996667741545416
+    a0 = 1 + K / Q + K * K
+    shelf_b = ((Vh + Vb * K / Q + K * K) / a0, 2 * (K * K - Vh) / a0, (Vh - Vb * K / Q + K * K) / a0)
+    shelf_a = (1.0, 2 * (K * K - 1) / a0, (1 - K / Q + K * K) / a0)
+    # Stage 2: high-pass
+    K = math.tan(math.pi * 38.13547087602444 / rate)
+    Q = 0.5003270373238773
+    a0 = 1 + K / Q + K * K
+    hp_b = (1.0, -2.0, 1.0)
+    hp_a = (1.0, 2 * (K * K - 1) / a0, (1 - K / Q + K * K) / a0)
+
+    z1 = np.exp(-2j * np.pi * freqs / rate)
+    z2 = z1 * z1
+    h = 1.0
+    for b, a in ((shelf_b, shelf_a), (hp_b, hp_a)):
+        h = h * (b[0] + b[1] * z1 + b[2] * z2) / (a[0] + a[1] * z1 + a[2] * z2)
+    return np.abs(h) ** 2
+
+
+def analyse(chunks, rate, channels, size=-16):
+    """(integrated loudness in LUFS, sample peak 0..1) over an iterable of raw PCM chunks.
+
+    Each chunk is interleaved PCM in the mixer's sample format. K-weighting is
+    applied in the frequency domain on 100 ms sub-blocks, all sub-blocks of a
+    chunk at once, and the mean squares are gated as in EBU R128.
+    Loudness is None for silence. Needs NumPy (see available()).
+    """
+    if not available():
+        raise RuntimeError("Loudness analysis needs NumPy")
+    dtype = np.dtype(_SAMPLE_TYPES[size])
+    sub = int(rate * SUBBLOCK_SECONDS)
+    weights = _k_weighting_power(np.fft.rfftfreq(sub, 1.0 / rate), rate)
+    powers = []
+    peak = 0.0
+    carry = np.empty((0, channels), dtype=np.float32)
+    for chunk in chunks:
+        x = np.frombuffer(chunk, dtype=dtype)
+        x = x[:len(x) - len(x) % channels].reshape(-1, channels).astype(np.float32)
+        if dtype.kind == "u":
+            x -= 2 ** (8 * dtype.itemsize - 1)
+        if dtype.kind in "iu":
+            x /= 2 ** (8 * dtype.itemsize - 1)
+        if len(x):
+            peak = max(peak, float(np.abs(x).max()))
+        x = np.concatenate((carry, x))
+        n = len(x) // sub
+        carry = x[n * sub:]
+        if not n:
+            continue
+        # (blocks, samples, channels) -> per-block K-weighted mean square, summed over channels
+        spectra = np.fft.rfft(x[:n * sub].reshape(n, sub, channels), axis=1)
+        power = np.abs(spectra) ** 2
+        power[:, 1:-1 if sub % 2 == 0 else None] *= 2
+        powers.append((power * weights[None, :, None]).sum(axis=(1, 2)) / (sub * sub))
+    if not powers:
+        return None, peak
+    subblocks = np.concatenate(powers)
+    if len(subblocks) < 4:
+        blocks = np.array([subblocks.mean()])
+    else:
+        blocks = np.convolve(subblocks, np.full(4, 0.25), mode="valid")
+    with np.errstate(divide="ignore"):
+        block_lufs = -0.691 + 10 * np.log10(blocks)
+    gated = blocks[block_lufs > ABSOLUTE_GATE_LUFS]
+    if not len(gated):
+        return None, peak
+    relative = -0.691 + 10 * math.log10(gated.mean()) + RELATIVE_GATE_LU
+    gated = blocks[block_lufs > max(relative, ABSOLUTE_GATE_LUFS)]
+    return -0.691 + 10 * math.log10(gated.mean()), peak
+
+
+def gain_for(loudness, peak, target=TARGET_LUFS):
+    """Playback gain (at most 1.0, since the mixer can't amplify) bringing a track to target."""
+    if loudness is None:
+        return 1.0
+    gain = 10 ** ((target - loudness) / 20)
+    if peak:
+        gain = min(gain, 1.0 / peak)
+    return min(1.0, gain)
+
+
+def pygame_chunks(path, disk_cache=None, chunk_seconds=CHUNK_SECONDS):
+    """(rate, channels, size, chunks) for path in the mixer's format.
+
+    Streams from disk_cache or a matching WAV when it can; otherwise pygame
+    decodes the whole file, which is refused for tracks over
+    MAX_DECODE_SECONDS so a long recording can't blow up memory.
+    """
+    import pygame
+    from .library import probe_duration
+    from .stream import open_stream
+    rate, size, channels = pygame.mixer.get_init()
+    stream = open_stream(path, (rate, size, channels), disk_cache, block_seconds=chunk_seconds)
+    if stream is not None:
+        return rate, channels, size, stream
+    duration = probe_duration(path, os.path.splitext(path)[1][1:].lower())
+    if duration is None or duration > MAX_DECODE_SECONDS:
+        raise ValueError(f"Not decoding {path} whole")
+    raw = pygame.mixer.Sound(path).get_raw()
+    step = int(rate * chunk_seconds) * channels * (abs(size) // 8)
+    view = memoryview(raw)
+    return rate, channels, size, (view[i:i + step] for i in range(0, len(view), step))
+
+
+class LoudnessAnalyzer:
+    """Background pass filling in loudness and peak for tracks the library hasn't analysed.
+
+    request(root) wakes the thread, which takes unanalysed tracks in batches
+    of batch_size, analyses them and writes each batch back to the library, so
+    every file is only decoded once (until it changes on disk). A track that
+    fails to decode is left unanalysed and skipped until the next request()
+    for its folder, so it is retried then rather than stuck at full gain.
+    Does nothing without NumPy.
+    """
+
+    def __init__(self, library, decode=pygame_chunks, batch_size=BATCH_SIZE):
+        # decode(path) -> (rate, channels, size, chunks of raw PCM)
+        self.library = library
+        self.decode = decode
+        self.batch_size = batch_size
+        self._cond = threading.Condition()
+        self._roots = []
+        self._failed = set()    # paths that didn't decode since their folder was last requested
+        self._thread = None
+
+    def request(self, root):
+        if not available():
+            return
+        with self._cond:
+            prefix = os.path.join(os.path.abspath(root), "")
+            self._failed = {path for path in self._failed if not path.startswith(prefix)}
+            if root not in self._roots:
+                self._roots.append(root)
+            self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._roots:
+                    self._cond.wait()
+                root = self._roots[0]
+            with self._cond:
+                failed = frozenset(self._failed)
+            batch = self.library.unanalysed(root, self.batch_size, exclude=failed)
+            if not batch:
+                with self._cond:
+                    self._roots.remove(root)
+                continue
+            results = []
+            for path in batch:
+                try:
+                    rate, channels, size, chunks = self.decode(path)
+                    loudness, peak = analyse(chunks, rate, channels, size)
+                except Exception:
+                    with self._cond:
+                        self._failed.add(path)
+                    continue
+                results.append((path, loudness, peak))
+            if results:
+                self.library.store_analysis(results)
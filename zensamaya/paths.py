@@ -0,0 +1,27 @@
+import os
+
+appname = "ZenSamaya"
+author = "SachinHrs"
+_data_dir = None
+
+
+def get_data_dir():
+    """The per-user data dir; appdirs is only imported the first time it's asked for."""
+    global _data_dir
+    if _data_dir is None:
+        from appdirs import user_data_dir
+        _data_dir = user_data_dir(appname, author)
+    return _data_dir
+
+
+def data_path(*parts):
+    """Path inside the per-user data dir, creating the data dir if needed."""
+    os.makedirs(get_data_dir(), exist_ok=True)
+    return os.path.join(get_data_dir(), *parts)
+
+
+def __getattr__(name):
+    # data_dir used to be computed at import time; keep it readable as an attribute
+    if name == "data_dir":
+        return get_data_dir()
+    raise AttributeError(name)
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+INDEX_FILE = "index.json"
+
+
+def content_hash(path, chunk_size=1024 * 1024):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PcmDiskCache:
+    """Decoded PCM for each track on disk, so a cold start never has to decode an MP3.
+
+    Entries are keyed by a content hash, and the hash itself is remembered per
+    (path, size, mtime), so an unchanged file is looked up without being read.
+    Hashing a file not seen before reads all of it; the audio thread passes
+    hash_missing=False and only ever does the (path, size, mtime) lookup.
+    PCM is stored raw in the mixer's (frequency, format, channels) layout and
+    handed back as a read-only mmap. The directory is kept under max_bytes by
+    evicting the least recently used entries. A hit only updates its use time
+    in memory (open() is on the alarm path); those reach index.json with the
+    next store() or discard(), or flush().
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._read_index()
+        self._dirty = False
+
+    def open(self, path, mixer_format, hash_missing=True):
+        """Read-only mmap of path's cached PCM in mixer_format, or None on a miss."""
+        try:
+            digest = self._digest(path, hash_missing)
+        except OSError:
+            return None
+        if digest is None:
+            return None
+        with self._lock:
+            entry = self._index["entries"].get(digest)
+            if entry is None or entry["format"] != list(mixer_format):
+                return None
+            entry["last_used"] = time.time()
+            self._dirty = True
+        try:
+            with open(os.path.join(self.cache_dir, digest + ".pcm"), "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.discard(path)
+            return None
+
+    def store(self, path, mixer_format, pcm):
+        try:
+            digest = self._digest(path)
+        except OSError:
+            return
+        if len(pcm) > self.max_bytes:
+            return
+        target = os.path.join(self.cache_dir, digest + ".pcm")
+        tmp = target + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp, target)
+        except OSError:
+            return
+        with self._lock:
+            self._index["entries"][digest] = {
+                "format": list(mixer_format),
+                "nbytes": len(pcm),
+                "last_used": time.time(),
+            }
+            self._evict_locked()
+            self._write_index()
+
+    def discard(self, path):
+        """Forget path's cached PCM (e.g. after the file is deleted)."""
+        with self._lock:
+            for stat_key in [k for k in self._index["files"] if k.startswith(os.path.abspath(path) + "|")]:
+                digest = self._index["files"].pop(stat_key)
+                if digest not in self._index["files"].values():
+                    self._remove_entry_locked(digest)
+            self._write_index()
+
+    def flush(self):
+        """Write use times recorded since the last index write, e.g. on exit."""
+        with self._lock:
+            if self._dirty:
+                self._write_index()
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return sum(e["nbytes"] for e in self._index["entries"].values())
+
+    def _digest(self, path, compute=True):
+        st = os.stat(path)
+        stat_key = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+        with self._lock:
+            digest = self._index["files"].get(stat_key)
+        if digest is None and compute:
+            digest = content_hash(path)
+            prefix = os.path.abspath(path) + "|"
+            with self._lock:
+                files = self._index["files"]
+                for stale in [k for k in files if k.startswith(prefix)]:
+                    del files[stale]
+                files[stat_key] = digest
+                self._write_index()     # so the hash isn't worked out again next run, hit or miss
+        return digest
+
+    def _evict_locked(self):
+        entries = self._index["entries"]
+        total = sum(e["nbytes"] for e in entries.values())
+        for digest in sorted(entries, key=lambda d: entries[d]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries[digest]["nbytes"]
+            self._remove_entry_locked(digest)
+
+    def _remove_entry_locked(self, digest):
+        self._index["entries"].pop(digest, None)
+        try:
+            os.remove(os.path.join(self.cache_dir, digest + ".pcm"))
+        except OSError:
+            pass
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, INDEX_FILE)) as f:
+                index = json.load(f)
+            if isinstance(index.get("files"), dict) and isinstance(index.get("entries"), dict):
+                return index
+        except Exception:
+            pass
+        return {"files": {}, "entries": {}}
+
+    def _write_index(self):
+        self._dirty = False
+        path = os.path.join(self.cache_dir, INDEX_FILE)
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(self._index, f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
+
+def cached_sound_loader(disk_cache):
+    """SoundCache loader that reads PCM from disk_cache and fills it on a miss."""
+    import pygame
+
+    def load(path):
+        mixer_format = pygame.mixer.get_init()
+        pcm = disk_cache.open(path, mixer_format)
+        if pcm is not None:
+            try:
+                return pygame.mixer.Sound(buffer=pcm)
+            finally:
+                pcm.close()
+        sound = pygame.mixer.Sound(path)
+        disk_cache.store(path, mixer_format, sound.get_raw())
+        return sound
+
+    return load
+
+
+def disk_cache_filler(disk_cache):
+    """SoundCache filler that decodes a track into disk_cache once, keeping nothing in memory.
+
+    For tracks too long to hold decoded: they are streamed from the disk
+    cache at play time, so this is their one-off decode. The decode is still
+    whole-file, so callers keep it to tracks under stream.MAX_DECODE_SECONDS.
+    """
+    def fill(path):
+        import pygame
+        mixer_format = pygame.mixer.get_init()
+        if not mixer_format:
+            return
+        pcm = disk_cache.open(path, mixer_format)
+        if pcm is not None:
+            pcm.close()
+            return
+        disk_cache.store(path, mixer_format, pygame.mixer.Sound(path).get_raw())
+
+    return fill
@@ -0,0 +1,398 @@
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .stream import BLOCK_SECONDS, MAX_DECODE_SECONDS, STREAM_OVER_SECONDS, open_stream
+
+FADE_IN_MS = 0
+FADE_OUT_MS = 2000
+CROSSFADE_MS = 2000
+# Volume is re-applied this often while a fade is running, and not otherwise
+FADE_STEP_NS = 10_000_000
+# An alarm starting later than this after its deadline rings its full length from now
+LATE_START_NS = 1_000_000_000
+# A streaming voice checks its channel queue this often, half a block ahead
+STREAM_CHECK_NS = int(BLOCK_SECONDS * 1e9) // 2
+
+FADE_CURVES = {
+    "linear": lambda x: x,
+    "equal_power": lambda x: math.sin(x * math.pi / 2),
+    "smooth": lambda x: x * x * (3 - 2 * x),
+    "exponential": lambda x: x * x,
+}
+
+
+class _Voice:
+    """One sounding track and its gain envelope over monotonic time."""
+
+    def __init__(self, file_path, player, sound, start_ns, end_ns, fade_in_ns, fade_out_ns, on_finished, gain=1.0):
+        self.file_path = file_path
+        self.gain = gain
+        self.player = player
+        self.sound = sound
+        self.start_ns = start_ns
+        self.end_ns = end_ns
+        self.fade_in_ns = fade_in_ns
+        self.out_start_ns = end_ns - fade_out_ns
+        self.out_level = 1.0
+        self.on_finished = on_finished
+        self.applied = None
+        self.stream = None
+
+    def envelope(self, now, curve):
+        level = 1.0
+        if now < self.start_ns + self.fade_in_ns:
+            level = curve(max(0.0, (now - self.start_ns) / self.fade_in_ns))
+        if now >= self.out_start_ns:
+            span = self.end_ns - self.out_start_ns
+            level = min(level, self.out_level * curve(max(0.0, (self.end_ns - now) / span) if span > 0 else 0.0))
+        return level
+
+    def release(self, now, fade_ns, curve):
+        """Fade out from wherever the envelope is now, ending fade_ns from now."""
+        if now + fade_ns >= self.end_ns:
+            return
+        self.out_level = self.envelope(now, curve)
+        self.out_start_ns = now
+        self.end_ns = now + fade_ns
+
+    def ramping(self, now):
+        return now < self.start_ns + self.fade_in_ns or now >= self.out_start_ns
+
+    def next_change_ns(self, now):
+        if self.ramping(now):
+            return min(now + FADE_STEP_NS, self.end_ns)
+        if self.stream is not None:
+            return min(now + STREAM_CHECK_NS, self.out_start_ns)
+        return self.out_start_ns
+
+
+class MixerAudio:
+    """AlarmEngine audio backend: one long-lived thread that owns pygame.mixer.
+
+    Every call into the mixer (initialising it, alarm playback, mute, fades,
+    test play, quitting) is a command on this object's queue, run in
+    order by its thread, so there is no thread per alarm and no lock around
+    the mixer. Between commands the thread sleeps until the next volume
+    change is due: every FADE_STEP_NS while a fade is running, otherwise not
+    until the next fade begins.
+
+    Each alarm is a voice with a gain envelope: fade_in_ms up from silence,
+    fade_out_ms down to silence ending exactly duration seconds after the
+    alarm's scheduled start, shaped by fade_curve (see FADE_CURVES). A
+    prefetched Sound loops gaplessly on its own channel and is cut by the
+    mixer itself at the end time; a new alarm while another is still sounding
+    crossfades over crossfade_ms instead of cutting it off. If track_gain is
+    set, track_gain(file_path) scales each voice (loudness normalisation).
+
+    Tracks with no decoded Sound in memory are streamed: PCM blocks from the
+    disk cache (or a WAV in the mixer's format) are fed to the channel's
+    queue a block ahead, so memory stays bounded whatever the track length.
+    Tracks longer than stream_over_seconds (per track_duration(file_path))
+    are never held decoded in memory: preload() has the sound cache decode
+    them once, in the background, into the disk cache they stream from.
+    Over fill_max_seconds not even that (decoding is whole-file, so memory
+    would grow with the track): those, and anything else that can't be
+    streamed, fall back to mixer.music. The audio
+    thread never hashes a file to find it in the disk cache.
+
+    playing_until_ns is the monotonic end of the alarm currently ringing
+    (None when idle) for countdown displays. on_started(end_ns), on_error(msg)
+    and play()'s on_finished are called from the audio thread.
+    """
+
+    def __init__(self, sound_cache=None, disk_cache=None, event_log=None, on_started=None, on_error=None,
+                 fade_in_ms=FADE_IN_MS, fade_out_ms=FADE_OUT_MS, crossfade_ms=CROSSFADE_MS, fade_curve="linear"):
+        self.sound_cache = sound_cache
+        self.disk_cache = disk_cache
+        self.event_log = event_log
+        self.on_started = on_started
+        self.on_error = on_error
+        self.fade_in_ms = fade_in_ms
+        self.fade_out_ms = fade_out_ms
+        self.crossfade_ms = crossfade_ms
+        self.fade_curve = fade_curve
+        self.track_gain = None
+        self.track_duration = None
+        self.stream_over_seconds = STREAM_OVER_SECONDS
+        self.fill_max_seconds = MAX_DECODE_SECONDS
+        self.playing_until_ns = None
+        self._muted = False
+        self._voices = []
+        self._ringing = None
+        self._test_file = None
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # Commands; safe to call from any thread
+
+    def init_mixer(self):
+        """Import pygame and initialise the mixer on the audio thread; the Future raises on failure."""
+        return self._send(self._init_mixer)
+
+    def play(self, file_path, duration, mute_state, on_finished, start_ns=None, trace=None):
+        """Ring file_path for duration seconds from start_ns (its scheduled deadline) or now."""
+        sound = self.sound_cache.get(file_path) if self.sound_cache and not self._is_long(file_path) else None
+        gain = self.track_gain(file_path) if self.track_gain else 1.0
+        return self._send(self._play, file_path, duration, mute_state['muted'], sound, on_finished, start_ns, gain,
+                          trace)
+
+    def set_muted(self, muted):
+        return self._send(self._set_muted, muted)
+
+    def fade(self, fade_ms=None):
+        """Fade the ringing alarm out now (over fade_out_ms by default); it finishes when the fade does."""
+        return self._send(self._fade, self.fade_out_ms if fade_ms is None else fade_ms)
+
+    def stop(self):
+        return self._send(self._fade_all, self.fade_out_ms)
+
+    def preload(self, file_path):
+        if not self.sound_cache:
+            return
+        if self._is_long(file_path):
+            duration = self.track_duration(file_path)
+            if duration <= self.fill_max_seconds:
+                self.sound_cache.fill(file_path)
+        else:
+            self.sound_cache.prefetch(file_path)
+
+    def forget(self, file_path):
+        if self.sound_cache:
+            self.sound_cache.discard(file_path)
+        if self.disk_cache:
+            self.disk_cache.discard(file_path)
+
+    def test_play(self, file_path):
+        """Play (or resume) file_path through mixer.music; the Future raises on failure."""
+        return self._send(self._test_play, file_path)
+
+    def test_pause(self):
+        return self._send(self._test_pause)
+
+    def close(self, timeout=3.0):
+        """Stop everything, quit the mixer and end the audio thread."""
+        future = self._send(self._quit)
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self.disk_cache:
+            self.disk_cache.flush()
+        return future
+
+    def _is_long(self, file_path):
+        duration = self.track_duration(file_path) if self.track_duration else None
+        return duration is not None and duration > self.stream_over_seconds
+
+    def _send(self, fn, *args):
+        future = Future()
+        self._queue.put((fn, args, future))
+        return future
+
+    # Audio thread
+
+    def _run(self):
+        while True:
+            wake_ns = self._next_wake_ns()
+            timeout = None if wake_ns is None else max(0, wake_ns - time.monotonic_ns()) / 1e9
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                fn, args, future = item
+                try:
+                    future.set_result(fn(*args))
+                except Exception as e:
+                    future.set_exception(e)
+            self._advance()
+
+    @property
+    def _curve(self):
+        return FADE_CURVES.get(self.fade_curve, FADE_CURVES["linear"])
+
+    def _next_wake_ns(self):
+        now = time.monotonic_ns()
+        return min((v.next_change_ns(now) for v in self._voices), default=None)
+
+    def _advance(self):
+        now = time.monotonic_ns()
+        for voice in list(self._voices):
+            if now >= voice.end_ns:
+                self._end_voice(voice)
+                continue
+            self._apply(voice, now)
+            if voice.stream is not None:
+                self._refill(voice)
+
+    def _apply(self, voice, now):
+        volume = 0.0 if self._muted else voice.gain * voice.envelope(now, self._curve)
+        if volume != voice.applied:
+            try:
+                voice.player.set_volume(volume)
+            except Exception as e:
+                self._report_error(f"Error setting volume: {e}")
+            voice.applied = volume
+
+    def _play(self, file_path, duration, muted, sound, on_finished, start_ns, gain=1.0, trace=None):
+        import pygame
+        if trace:
+            trace.mark("dequeued")
+        now = time.monotonic_ns()
+        # Anchor to the schedule so the alarm ends on time, unless it is badly late
+        if start_ns is None or now - start_ns > LATE_START_NS:
+            start_ns = now
+        end_ns = start_ns + duration * 1_000_000_000
+        fade_in_ns = self.fade_in_ms * 1_000_000
+        fade_out_ns = self.fade_out_ms * 1_000_000
+        stream = None
+        if sound is None:
+            stream = open_stream(file_path, pygame.mixer.get_init(), self.disk_cache, loop=True, hash_missing=False)
+        previous = self._ringing
+        if previous is not None:
+            if sound is None and stream is None and previous.player is pygame.mixer.music:
+                self._end_voice(previous)    # can't crossfade mixer.music with itself
+            else:
+                fade_in_ns = max(fade_in_ns, self.crossfade_ms * 1_000_000)
+                previous.release(now, self.crossfade_ms * 1_000_000, self._curve)
+                self._ringing = None
+                self.playing_until_ns = None
+        # Keep both fades inside the alarm
+        span_ns = end_ns - start_ns
+        if fade_in_ns + fade_out_ns > span_ns:
+            scale = span_ns / (fade_in_ns + fade_out_ns)
+            fade_in_ns, fade_out_ns = int(fade_in_ns * scale), int(fade_out_ns * scale)
+        self._muted = muted
+        try:
+            # A prefetched Sound loops gaplessly from memory on its own channel and
+            # the mixer cuts it at end_ns; failing that stream PCM blocks onto a
+            # channel, and failing that stream the file through mixer.music
+            player = None
+            if sound is not None:
+                if trace:
+                    trace.mark("decoded")
+                player = sound.play(loops=-1, maxtime=max(1, (end_ns - now) // 1_000_000))
+            if stream is not None:
+                player = self._start_stream(stream, trace)
+                if player is None:
+                    stream = None
+            if player is None:
+                for other in [v for v in self._voices if v.player is pygame.mixer.music]:
+                    self._end_voice(other)
+                pygame.mixer.music.load(file_path)
+                if trace:
+                    trace.mark("decoded")
+                pygame.mixer.music.play(loops=-1)
+                player = pygame.mixer.music
+            if trace:
+                trace.mark("audio_out")
+        except Exception as e:
+            self._report_error(f"Error playing {file_path}: {e}")
+            on_finished()
+            return
+        channel_sound = sound if player is not pygame.mixer.music else None
+        voice = _Voice(file_path, player, channel_sound, start_ns, end_ns, fade_in_ns, fade_out_ns, on_finished, gain)
+        voice.stream = stream
+        self._apply(voice, now)
+        self._voices.append(voice)
+        self._ringing = voice
+        self.playing_until_ns = end_ns
+        self._log("playback_started", file=file_path, start_ns=start_ns, end_ns=end_ns)
+        if self.on_started:
+            self.on_started(end_ns)
+
+    def _start_stream(self, stream, trace=None):
+        import pygame
+        first = next(stream, None)
+        if first and trace:
+            trace.mark("decoded")
+        channel = pygame.mixer.Sound(buffer=first).play() if first else None
+        if channel is None:
+            stream.close()
+            return None
+        block = next(stream, None)
+        if block:
+            channel.queue(pygame.mixer.Sound(buffer=block))
+        return channel
+
+    def _refill(self, voice):
+        import pygame
+        try:
+            if voice.player.get_queue() is None:
+                block = next(voice.stream, None)
+                if block:
+                    voice.player.queue(pygame.mixer.Sound(buffer=block))
+        except Exception as e:
+            self._report_error(f"Error streaming {voice.file_path}: {e}")
+            voice.stream = None
+
+    def _set_muted(self, muted):
+        if muted == self._muted:
+            return
+        self._muted = muted
+        now = time.monotonic_ns()
+        for voice in self._voices:
+            self._apply(voice, now)
+
+    def _fade(self, fade_ms):
+        if self._ringing is not None:
+            self._ringing.release(time.monotonic_ns(), fade_ms * 1_000_000, self._curve)
+            self.playing_until_ns = self._ringing.end_ns
+
+    def _fade_all(self, fade_ms):
+        now = time.monotonic_ns()
+        for voice in self._voices:
+            voice.release(now, fade_ms * 1_000_000, self._curve)
+        if self._ringing is not None:
+            self.playing_until_ns = self._ringing.end_ns
+
+    def _end_voice(self, voice):
+        self._voices.remove(voice)
+        if voice.stream is not None:
+            voice.stream.close()
+        if voice is self._ringing:
+            self._ringing = None
+            self.playing_until_ns = None
+        try:
+            # The mixer already freed a Sound's channel at maxtime; don't stop whoever reused it
+            if voice.sound is None or voice.player.get_sound() is voice.sound:
+                voice.player.stop()
+        except Exception as e:
+            self._report_error(f"Error stopping music: {e}")
+        self._log("playback_ended", file=voice.file_path)
+        voice.on_finished()
+
+    def _test_play(self, file_path):
+        import pygame
+        if pygame.mixer.music.get_busy() and self._test_file == file_path:
+            pygame.mixer.music.unpause()
+        else:
+            pygame.mixer.music.load(file_path)
+            pygame.mixer.music.play(loops=-1)
+            self._test_file = file_path
+
+    def _init_mixer(self):
+        import pygame
+        pygame.mixer.init()
+
+    def _test_pause(self):
+        import pygame
+        pygame.mixer.music.pause()
+
+    def _quit(self):
+        import pygame
+        for voice in list(self._voices):
+            self._end_voice(voice)
+        pygame.mixer.quit()
+
+    def _report_error(self, msg):
+        if self.on_error:
+            self.on_error(msg)
+
+    def _log(self, event, **fields):
+        if self.event_log is not None:
+            self.event_log.write(event, **fields)
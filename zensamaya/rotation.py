@@ -0,0 +1,141 @@
+import collections
+import json
+import os
+import random
+
+WEIGHTINGS = (None, "play_count", "length", "favourites")
+FAVOURITE_BOOST = 4.0
+
+
+class ShuffleBag:
+    """Non-repeating sound rotation with O(1) picks.
+
+    Each pass through the library is one shuffled bag, so every track plays
+    once before any plays again. Whenever a new bag is dealt, the last
+    `history` picks are moved to its end, so they can't come straight back
+    across the bag boundary. With a weighting, the bag is dealt by weighted
+    random order instead of a plain shuffle, so heavier tracks tend to come up
+    earlier in each pass:
+
+      play_count  - least played first
+      length      - longer tracks first (durations from the library index)
+      favourites  - pinned favourites boosted
+
+    save() writes the bag position, history and play counts to state_path, so
+    the rotation carries on across restarts.
+    """
+
+    def __init__(self, history=2, weighting=None, state_path=None, rng=None):
+        self.history = history
+        self.weighting = weighting
+        self.state_path = state_path
+        self.durations = {}
+        self.favourites = set()
+        self.play_counts = collections.Counter()
+        self._rng = rng or random.Random()
+        self._items = {}            # ordered set of current tracks
+        self._order = []
+        self._pos = 0
+        self._recent = collections.deque(maxlen=max(history, 1))
+        self._load()
+
+    def __len__(self):
+        return len(self._items)
+
+    def set_items(self, items):
+        """Use items as the library, keeping the current bag when it hasn't changed."""
+        items = list(dict.fromkeys(items))
+        wanted = set(items)
+        if wanted == set(self._items):
+            return
+        self.remove([p for p in self._items if p not in wanted])
+        self.add(items)
+
+    def add(self, items):
+        pending = None
+        for item in items:
+            if item in self._items:
+                continue
+            self._items[item] = None
+            if pending is None:
+                pending = set(self._order[self._pos:])
+            if item not in pending:
+                # Slot it somewhere in the rest of the current bag
+                self._order.insert(self._rng.randint(self._pos, len(self._order)), item)
+
+    def remove(self, items):
+        # Stale entries left in the bag are skipped when they come up
+        for item in items:
+            self._items.pop(item, None)
+
+    def pick(self):
+        """Next track, or None when the library is empty."""
+        if not self._items:
+            return None
+        while True:
+            if self._pos >= len(self._order):
+                self._deal()
+            item = self._order[self._pos]
+            self._pos += 1
+            if item in self._items:
+                break
+        self._recent.append(item)
+        return item
+
+    def mark_played(self, item):
+        self.play_counts[item] += 1
+
+    def _weight(self, item):
+        if self.weighting == "play_count":
+            return 1.0 / (1 + self.play_counts[item])
+        if self.weighting == "length":
+            return self.durations.get(item) or 1.0
+        if self.weighting == "favourites":
+            return FAVOURITE_BOOST if item in self.favourites else 1.0
+        return 1.0
+
+    def _deal(self):
+        items = list(self._items)
+        if self.weighting:
+            # Efraimidis-Spirakis weighted random order
+            keys = {p: self._rng.random() ** (1.0 / max(self._weight(p), 1e-9)) for p in items}
+            items.sort(key=keys.__getitem__, reverse=True)
+        else:
+            self._rng.shuffle(items)
+        # With a tiny library keep at least one track eligible for the front
+        keep = min(self.history, len(items) - 1)
+        if keep > 0:
+            recent = set(list(self._recent)[-keep:])
+            items = [p for p in items if p not in recent] + [p for p in items if p in recent]
+        self._order = items
+        self._pos = 0
+
+    def _load(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            self._order = list(state["order"])
+            self._pos = min(int(state.get("pos", 0)), len(self._order))
+            self._items = dict.fromkeys(self._order)
+            self._recent.extend(state.get("recent", []))
+            self.play_counts.update(state.get("play_counts", {}))
+        except Exception:
+            self._order, self._items = [], {}
+
+    def save(self):
+        if not self.state_path:
+            return
+        state = {
+            "order": self._order,
+            "pos": self._pos,
+            "recent": list(self._recent),
+            "play_counts": dict(self.play_counts),
+        }
+        try:
+            with open(self.state_path + ".tmp", "w") as f:
+                json.dump(state, f)
+            os.replace(self.state_path + ".tmp", self.state_path)
+        except OSError:
+            pass
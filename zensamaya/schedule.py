@@ -0,0 +1,114 @@
+import bisect
+from array import array
+from datetime import datetime
+
+NS_PER_SECOND = 1_000_000_000
+
+
+class Bitset:
+    """Fixed number of flags packed eight to a byte, e.g. one per alarm.
+
+    dumps() gives "count:hex" for settings files; loads() also takes the
+    older list-of-bools form.
+    """
+    __slots__ = ("size", "_bytes")
+
+    def __init__(self, size=0):
+        self.size = size
+        self._bytes = bytearray((size + 7) // 8)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        return bool(self._bytes[i >> 3] >> (i & 7) & 1)
+
+    def __setitem__(self, i, value):
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        if value:
+            self._bytes[i >> 3] |= 1 << (i & 7)
+        else:
+            self._bytes[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def __iter__(self):
+        return (self[i] for i in range(self.size))
+
+    def count(self):
+        return sum(bin(b).count("1") for b in self._bytes)
+
+    def dumps(self):
+        return f"{self.size}:{self._bytes.hex()}"
+
+    @classmethod
+    def loads(cls, value, size=None):
+        """Bitset from dumps() output or a list of bools; None if it's malformed or not size flags long."""
+        try:
+            if isinstance(value, str):
+                count, hex_bytes = value.split(":", 1)
+                bits = cls(int(count))
+                data = bytes.fromhex(hex_bytes)
+                if len(data) != len(bits._bytes):
+                    return None
+                bits._bytes[:] = data
+                if bits.size % 8:
+                    bits._bytes[-1] &= (1 << bits.size % 8) - 1
+            else:
+                flags = list(value)
+                bits = cls(len(flags))
+                for i, flag in enumerate(flags):
+                    bits[i] = flag
+        except (TypeError, ValueError):
+            return None
+        if size is not None and bits.size != size:
+            return None
+        return bits
+
+
+class Schedule:
+    """A session's alarms as one array of wall-clock epoch nanoseconds, in order.
+
+    Eight bytes per alarm. mono_offset_ns is the monotonic clock minus the
+    wall clock when the session was set; alarms fire on the monotonic clock,
+    so a wall clock change mid-session doesn't move them. Because the
+    deadlines are sorted, prev_next() and the countdowns are bisects however
+    long the schedule is.
+    """
+    __slots__ = ("epoch_ns", "mono_offset_ns")
+
+    def __init__(self, epoch_ns=(), mono_offset_ns=0):
+        self.epoch_ns = array('q', epoch_ns)
+        if any(a > b for a, b in zip(self.epoch_ns, self.epoch_ns[1:])):
+            raise ValueError("Alarm deadlines must be in order.")
+        self.mono_offset_ns = mono_offset_ns
+
+    @classmethod
+    def from_datetimes(cls, times, wall_ns, mono_ns):
+        """Schedule for local datetimes, anchored to a (wall, monotonic) reading taken together."""
+        return cls((round(dt.timestamp() * NS_PER_SECOND) for dt in times), mono_ns - wall_ns)
+
+    def __len__(self):
+        return len(self.epoch_ns)
+
+    def mono_ns(self, i):
+        return self.epoch_ns[i] + self.mono_offset_ns
+
+    def monotonic(self):
+        """Every deadline on the monotonic clock, for DeadlineScheduler.arm()."""
+        offset = self.mono_offset_ns
+        return array('q', (ns + offset for ns in self.epoch_ns))
+
+    def time(self, i):
+        seconds, ns = divmod(self.epoch_ns[i], NS_PER_SECOND)
+        return datetime.fromtimestamp(seconds).replace(microsecond=ns // 1000).time()
+
+    def prev_next(self, now):
+        """(previous, next) alarm indices around monotonic time now, either may be None."""
+        i = bisect.bisect_right(self.epoch_ns, now - self.mono_offset_ns)
+        return (i - 1 if i > 0 else None), (i if i < len(self.epoch_ns) else None)
+
+    def seconds_until(self, i, now):
+        """Whole seconds (rounded up) from monotonic time now to alarm i, 0 once it's due."""
+        return max(0, -((now - self.mono_ns(i)) // NS_PER_SECOND))
@@ -0,0 +1,131 @@
+import bisect
+import threading
+import time
+import traceback
+from array import array
+
+
+class DeadlineScheduler:
+    """Alarm deadlines (integer monotonic nanoseconds) in one sorted array, and a cursor at the next one due.
+
+    Instead of waking every second and re-scanning the whole schedule, a
+    front-end either runs start() (a thread sleeping on a condition until the
+    earliest deadline) or asks seconds_until_next() to arm a single-shot timer
+    and calls pop_due() when it fires. arm()/clear()/shift()/stop() wake the
+    sleeper so changes take effect immediately. With max_wait_ns the thread
+    also wakes at least that often and calls on_wake() first, so its owner
+    can notice a suspend the monotonic clock slept through.
+    """
+
+    def __init__(self, clock=time.monotonic_ns, max_wait_ns=None, on_wake=None):
+        self._clock = clock
+        self._max_wait_ns = max_wait_ns
+        self._on_wake = on_wake
+        self._cond = threading.Condition()
+        self._deadlines = array('q')
+        self._order = None      # alarm index of each sorted deadline; None when they came in order
+        self._next = 0          # first deadline not yet popped
+        self._generation = 0
+
+    def arm(self, deadlines, skip_before=None):
+        """Replace the schedule; deadlines before skip_before count as already passed."""
+        with self._cond:
+            deadlines = array('q', deadlines)
+            if any(a > b for a, b in zip(deadlines, deadlines[1:])):
+                self._order = array('q', sorted(range(len(deadlines)), key=deadlines.__getitem__))
+                deadlines = array('q', (deadlines[i] for i in self._order))
+            else:
+                self._order = None
+            self._deadlines = deadlines
+            self._next = 0 if skip_before is None else bisect.bisect_left(deadlines, skip_before)
+            self._cond.notify_all()
+
+    def shift(self, delta_ns, now=None):
+        """Move every deadline by delta_ns, keeping the ones already popped popped.
+
+        Of the pending deadlines the shift leaves overdue only the latest stays
+        due, so a long suspend rings one catch-up alarm rather than a burst.
+        """
+        if now is None:
+            now = self._clock()
+        with self._cond:
+            self._deadlines = array('q', (ns + delta_ns for ns in self._deadlines))
+            while self._next + 1 < len(self._deadlines) and self._deadlines[self._next + 1] <= now:
+                self._next += 1
+            self._cond.notify_all()
+
+    def clear(self):
+        with self._cond:
+            self._deadlines = array('q')
+            self._order = None
+            self._next = 0
+            self._cond.notify_all()
+
+    def next_deadline(self):
+        with self._cond:
+            return self._next_deadline_locked()
+
+    def seconds_until_next(self, now=None):
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+        if now is None:
+            now = self._clock()
+        return max(0, deadline - now) / 1e9
+
+    def pop_due(self, now=None):
+        """Remove and return the indices of all alarms whose deadline has passed."""
+        if now is None:
+            now = self._clock()
+        with self._cond:
+            return self._pop_due_locked(now)
+
+    def start(self, on_due):
+        """Run the scheduler in a daemon thread calling on_due(indices) as alarms pass."""
+        with self._cond:
+            self._generation += 1
+            generation = self._generation
+        thread = threading.Thread(target=self._run, args=(generation, on_due), daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        with self._cond:
+            self._generation += 1
+            self._cond.notify_all()
+
+    def _next_deadline_locked(self):
+        return self._deadlines[self._next] if self._next < len(self._deadlines) else None
+
+    def _pop_due_locked(self, now):
+        end = bisect.bisect_right(self._deadlines, now, self._next)
+        if self._order is None:
+            due = list(range(self._next, end))
+        else:
+            due = list(self._order[self._next:end])
+        self._next = end
+        return due
+
+    def _run(self, generation, on_due):
+        while True:
+            with self._cond:
+                while self._generation == generation:
+                    if self._on_wake is not None:
+                        self._on_wake()     # may shift() the deadlines; the condition's lock is reentrant
+                    deadline = self._next_deadline_locked()
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - self._clock()
+                        if remaining <= 0:
+                            break
+                    if self._max_wait_ns is not None:
+                        remaining = self._max_wait_ns if remaining is None else min(remaining, self._max_wait_ns)
+                    self._cond.wait(None if remaining is None else remaining / 1e9)
+                if self._generation != generation:
+                    return
+                due = self._pop_due_locked(self._clock())
+            if due:
+                try:
+                    on_due(due)
+                except Exception:
+                    traceback.print_exc()   # keep the thread alive for the alarms still to come
@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+
+
+class SettingsStore:
+    """settings.json written off the UI thread, coalescing bursts of saves.
+
+    save() only records the latest snapshot; a background thread writes it
+    once no further save has arrived for `delay` seconds. Writes go to a temp
+    file that is fsynced and then os.replace()d over the real one, so a crash
+    leaves either the old or the new settings, never a truncated file. Call
+    close() on exit to write anything still pending. One write at a time:
+    taking a snapshot and writing it happen under the same lock, so a flush
+    can't race the thread on the temp file or land an older snapshot last.
+    """
+
+    def __init__(self, path, delay=0.5):
+        self.path = path
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()     # taken before _cond, never inside it
+        self._pending = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def load(self):
+        """Latest settings (including an unwritten snapshot), or {} if there are none."""
+        with self._cond:
+            if self._pending is not None:
+                return dict(self._pending)
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def save(self, settings):
+        with self._cond:
+            self._pending = dict(settings)
+            self._cond.notify_all()
+
+    def flush(self):
+        """Write the pending snapshot now, after any write already under way."""
+        with self._write_lock:
+            with self._cond:
+                pending, self._pending = self._pending, None
+            if pending is not None:
+                self._write(pending)
+
+    def close(self, timeout=5.0):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Let the burst settle: restart the window on every new snapshot
+                snapshot = self._pending
+                while True:
+                    self._cond.wait(self.delay)
+                    if self._closed or self._pending is snapshot:
+                        break
+                    snapshot = self._pending
+                if self._closed:
+                    return
+            self.flush()
+
+    def _write(self, settings):
+        tmp = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(settings, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Error saving settings: {e}")
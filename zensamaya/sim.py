@@ -0,0 +1,106 @@
+import time
+
+from .core import NS_PER_SECOND, AlarmEngine, NullAudio
+
+
+class VirtualClock:
+    """Fake monotonic clock that only moves when told to, so a whole day runs in milliseconds.
+
+    Wall time tracks it from a fixed offset, like a real machine with no NTP
+    adjustments.
+    """
+
+    def __init__(self, wall_ns=None):
+        self.now_ns = 0
+        self.wall_offset_ns = time.time_ns() if wall_ns is None else wall_ns
+
+    def monotonic_ns(self):
+        return self.now_ns
+
+    def time_ns(self):
+        return self.now_ns + self.wall_offset_ns
+
+    def set_wall(self, wall_ns):
+        self.wall_offset_ns = wall_ns - self.now_ns
+
+    def advance_ns(self, ns):
+        self.now_ns += ns
+
+
+class RecordingAudio(NullAudio):
+    """NullAudio that also remembers when (in virtual time) each alarm started."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.started_at = []
+
+    def play(self, file_path, duration, mute_state, on_finished, start_ns=None, trace=None):
+        self.started_at.append(self.clock.monotonic_ns())
+        super().play(file_path, duration, mute_state, on_finished, start_ns, trace)
+
+
+class SimResult:
+    def __init__(self, num_alarms, fired, wakeups, simulated_seconds, cpu_seconds, wall_seconds, lateness):
+        self.num_alarms = num_alarms
+        self.fired = fired
+        self.wakeups = wakeups
+        self.simulated_seconds = simulated_seconds
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self.lateness = lateness        # nanoseconds after each alarm's deadline
+
+    @property
+    def wakeups_per_hour(self):
+        return self.wakeups * 3600 / self.simulated_seconds if self.simulated_seconds else 0.0
+
+    @property
+    def cpu_per_alarm(self):
+        return self.cpu_seconds / self.num_alarms
+
+    def lateness_percentile(self, pct):
+        if not self.lateness:
+            return 0
+        ordered = sorted(self.lateness)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def simulate(num_alarms, start=(6, 0, 0, 'AM'), end=(10, 0, 0, 'PM'), duration_seconds=10,
+             resolution_ns=1_000_000, poll_interval_ns=None, sound_files=None):
+    """Run one session against a virtual clock and return a SimResult.
+
+    The host timer is modelled as waking at the next multiple of resolution
+    after each deadline, like a millisecond single-shot timer. Passing
+    poll_interval_ns instead models a fixed-rate polling loop (the old 1 s tick).
+    """
+    clock = VirtualClock()
+    audio = RecordingAudio(clock)
+    engine = AlarmEngine(audio=audio, clock=clock)
+    start_dt = engine.at(*start)
+    clock.set_wall(round(start_dt.timestamp() - 60) * NS_PER_SECOND)
+    engine.schedule(start_dt, engine.at(*end), num_alarms, duration_seconds,
+                    sound_files or ['a.mp3', 'b.mp3', 'c.mp3'])
+
+    lateness = []
+    engine.on_alarm_started = lambda idx, path: lateness.append(clock.now_ns - engine.alarms.mono_ns(idx))
+
+    wakeups = 0
+    began = clock.now_ns
+    cpu0 = time.process_time()
+    wall0 = time.perf_counter()
+    while True:
+        deadline = engine.scheduler.next_deadline()
+        if deadline is None:
+            break
+        if poll_interval_ns:
+            clock.advance_ns(poll_interval_ns)
+        else:
+            wait = max(1, deadline - clock.now_ns)
+            clock.advance_ns(-(-wait // resolution_ns) * resolution_ns)
+        wakeups += 1
+        engine.poll()
+    cpu = time.process_time() - cpu0
+    wall = time.perf_counter() - wall0
+
+    simulated = (clock.now_ns - began) / NS_PER_SECOND
+    return SimResult(num_alarms, len(audio.started_at), wakeups, simulated, cpu, wall, lateness)
@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# Set by `python -m zensamaya.bench --startup`: the app prints its startup marks and quits
+BENCH_ENV = "ZENSAMAYA_STARTUP_BENCH"
+
+
+def benchmarking():
+    return bool(os.environ.get(BENCH_ENV))
+
+
+class StartupTimer:
+    """Milliseconds from launch to each startup milestone.
+
+    t0 should be taken at the very top of the entry script, before any heavy
+    import. Marks the apps record are imports (module imports done), window
+    (widgets built), first_paint (the event loop has drawn the window once)
+    and one per warm-up step.
+    """
+
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.marks = {}
+
+    def mark(self, name):
+        self.marks.setdefault(name, round((time.perf_counter() - self.t0) * 1000, 2))
+
+    def report(self, event_log=None):
+        if event_log is not None:
+            event_log.write("startup", **{f"{k}_ms": v for k, v in self.marks.items()})
+        if benchmarking():
+            print(json.dumps(self.marks), flush=True)
+
+
+class WarmUp:
+    """Startup work deferred until the window is on screen.
+
+    start() runs steps, a list of (name, fn), in order on a daemon thread,
+    marking each on timer as it completes. Each step has its own Future in
+    steps, so a caller that needs one (Set needs the mixer) can wait on just
+    that; done resolves with {name: exception or None} after the last step. A
+    failing step doesn't stop the ones after it.
+    """
+
+    def __init__(self, steps, timer=None):
+        self._steps = list(steps)
+        self.timer = timer
+        self.steps = {name: Future() for name, _ in self._steps}
+        self.done = Future()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def wait(self, name, timeout=None):
+        """Block until step name has run; re-raises its error."""
+        return self.steps[name].result(timeout)
+
+    def _run(self):
+        errors = {}
+        for name, fn in self._steps:
+            try:
+                self.steps[name].set_result(fn())
+                errors[name] = None
+            except Exception as e:
+                self.steps[name].set_exception(e)
+                errors[name] = e
+            if self.timer is not None:
+                self.timer.mark(name)
+        self.done.set_result(errors)
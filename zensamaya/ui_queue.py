@@ -0,0 +1,53 @@
+import threading
+import traceback
+
+FRAME_MS = 33
+# How often an idle queue is looked at when posts can't wake the UI thread themselves
+IDLE_MS = 500
+
+
+class UiQueue:
+    """Widget updates posted from any thread, applied by the UI thread once per frame.
+
+    post(key, fn, *args) only records the call; a later post for the same key
+    (usually the widget being updated) replaces it, so however often a
+    background thread reports, each widget is touched at most once per
+    drain(). drain() runs on the UI thread, from the toolkit's timer, and
+    applies the pending calls in the order their keys were first posted.
+    Background threads never call into the toolkit themselves. on_wake(),
+    if set, is called on the posting thread when a post arrives at an empty
+    queue, to get the UI thread to drain sooner than its idle poll; it must
+    not touch the toolkit either (e.g. it writes to a pipe the UI loop watches).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.posted = 0
+        self.applied = 0
+        self.on_wake = None
+
+    def post(self, key, fn, *args):
+        with self._lock:
+            first = not self._pending
+            self._pending[key] = (fn, args)
+            self.posted += 1
+        if first and self.on_wake:
+            self.on_wake()
+
+    def call(self, fn, *args):
+        """Post a call that must not be coalesced with any other (e.g. an error dialog)."""
+        self.post(object(), fn, *args)
+
+    def drain(self):
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+        for fn, args in pending.values():
+            try:
+                fn(*args)
+            except Exception:
+                traceback.print_exc()   # one bad update mustn't drop the rest of the frame
+        self.applied += len(pending)
+        return len(pending)
@@ -0,0 +1,120 @@
+from .core import NS_PER_SECOND
+from .frameclock import until_wall_second_ns
+
+FIELDS = ("prev_alarm", "next_alarm", "countdown_to_next", "ringing", "passed")
+_UNSET = object()
+
+
+def format_seconds(seconds):
+    """mm:ss, or just ss under a minute, as the ringing countdown shows it."""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02}:{seconds:02}" if minutes > 0 else f"{seconds:02}"
+
+
+def format_countdown(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"⌛ {hours}:{minutes:02}:{seconds:02}" if hours > 0 else f"⌛ {minutes:02}:{seconds:02}"
+
+
+def _until_change_ns(remaining_ns):
+    # A ceil-seconds countdown shows a new value once remaining_ns crosses a whole second
+    return (remaining_ns - 1) % NS_PER_SECOND + 1
+
+
+class SessionView:
+    """Display state of a session, shared by both front-ends and pushed to widgets only on change.
+
+    bind(field, setter) connects a field to a widget; refresh() works out
+    every field from the engine at one instant and calls only the setters
+    whose value differs from the one last pushed. The fields:
+
+      prev_alarm, next_alarm  "⬅️ 06:30:00 AM" / "➡️ 07:00:00 AM"
+      countdown_to_next       "⌛ 04:59", "" with nothing left to ring
+      ringing                 seconds left of the ringing alarm, else the alarm length
+      passed                  how many alarms' times have passed (an int)
+
+    Alarm time strings are formatted once per schedule, countdowns only when
+    their whole-second value moves. next_refresh_ns() is how long until the
+    next second boundary of either countdown (or of the wall clock, with
+    neither running), for the front-end's frame clock.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._setters = {}
+        self._pushed = {}
+        self._alarm_labels = {}
+        self._formatted = {}
+        self.pushes = 0
+
+    def bind(self, field, setter):
+        self._setters[field] = setter
+        self._pushed.pop(field, None)
+
+    def reset(self):
+        """A new schedule (or none): drop cached strings and push every field again."""
+        self._alarm_labels = {}
+        self._formatted = {}
+        self._pushed = {}
+        return self.refresh()
+
+    def state(self, now=None):
+        engine = self.engine
+        if now is None:
+            now = engine.clock.monotonic_ns()
+        if not engine.is_running:
+            return {"prev_alarm": "⬅️ None", "next_alarm": "➡️ None", "countdown_to_next": "",
+                    "ringing": self._format("ringing", engine.alarm_duration_seconds, format_seconds),
+                    "passed": 0}
+        prev_idx, next_idx, remaining = engine.status(now)
+        until_ns = engine.audio.playing_until_ns
+        ringing_left = 0 if until_ns is None else -(-(until_ns - now) // NS_PER_SECOND)
+        return {
+            "prev_alarm": "⬅️ None" if prev_idx is None else f"⬅️ {self._alarm_label(prev_idx)}",
+            "next_alarm": "➡️ None" if next_idx is None else f"➡️ {self._alarm_label(next_idx)}",
+            "countdown_to_next": "" if next_idx is None else self._format("countdown_to_next", remaining,
+                                                                          format_countdown),
+            "ringing": self._format("ringing", ringing_left if ringing_left > 0 else engine.alarm_duration_seconds,
+                                    format_seconds),
+            "passed": 0 if prev_idx is None else prev_idx + 1,
+        }
+
+    def refresh(self, now=None):
+        """Push the fields that changed; returns them as {field: value}."""
+        changed = {}
+        for field, value in self.state(now).items():
+            if self._pushed.get(field, _UNSET) == value:
+                continue
+            changed[field] = value
+            setter = self._setters.get(field)
+            if setter is not None:
+                self._pushed[field] = value
+                setter(value)
+                self.pushes += 1
+        return changed
+
+    def next_refresh_ns(self, now=None):
+        engine = self.engine
+        if now is None:
+            now = engine.clock.monotonic_ns()
+        waits = []
+        _, next_idx = engine.alarms.prev_next(now)
+        if next_idx is not None and engine.is_running:
+            waits.append(_until_change_ns(engine.alarms.mono_ns(next_idx) - now))
+        until_ns = engine.audio.playing_until_ns
+        if until_ns is not None and until_ns > now:
+            waits.append(_until_change_ns(until_ns - now))
+        return min(waits, default=until_wall_second_ns(engine.clock.time_ns()))
+
+    def _alarm_label(self, i):
+        text = self._alarm_labels.get(i)
+        if text is None:
+            text = self._alarm_labels[i] = self.engine.alarms.time(i).strftime('%I:%M:%S %p')
+        return text
+
+    def _format(self, field, seconds, fn):
+        cached = self._formatted.get(field)
+        if cached is None or cached[0] != seconds:
+            cached = self._formatted[field] = (seconds, fn(seconds))
+        return cached[1]
@@ -0,0 +1,138 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FolderWatcher:
+    """Watches the sound folder and reports debounced (added, removed) track paths.
+
+    Uses inotify where available and falls back to polling elsewhere. Either
+    way a burst of changes is collapsed into one SoundLibrary.refresh(), which
+    only relists the directories that actually changed, and the result is
+    diffed against the previous track list before on_change is called from
+    the watcher thread. With inotify the thread blocks in select() on the
+    inotify fd and a self-pipe that stop() writes to, so an idle folder
+    costs no wakeups at all.
+    """
+
+    def __init__(self, library, root, on_change, debounce=1.0, poll_interval=5.0):
+        self.library = library
+        self.root = os.path.abspath(root)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._known = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self._libc = _load_inotify()
+        self._fd = -1
+        self._wake_fds = None
+        self._watched = set()
+
+    def start(self, known_files=()):
+        self._known = set(known_files)
+        if self._libc is not None:
+            self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if self._fd < 0:
+                self._fd = -1
+            else:
+                self._wake_fds = os.pipe()
+        self._add_watches()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._wake_fds is not None:
+            try:
+                os.write(self._wake_fds[1], b"\0")
+            except OSError:
+                pass
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    @property
+    def uses_inotify(self):
+        return self._fd >= 0
+
+    def _add_watches(self):
+        if self._fd < 0:
+            return
+        for path in self.library.directories(self.root):
+            if path not in self._watched:
+                if self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK) >= 0:
+                    self._watched.add(path)
+
+    def _run(self):
+        try:
+            # Set starts from the index as it was; catch anything that changed since
+            self._sync()
+            while not self._stop.is_set():
+                if self._fd >= 0:
+                    if not self._wait_for_events():
+                        continue
+                elif self._stop.wait(self.poll_interval):
+                    break
+                self._sync()
+        finally:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+            if self._wake_fds is not None:
+                for fd in self._wake_fds:
+                    os.close(fd)
+                self._wake_fds = None
+
+    def _wait_for_events(self):
+        # No timeout: stop() wakes the select through the pipe
+        fds = [self._fd, self._wake_fds[0]]
+        ready, _, _ = select.select(fds, [], [])
+        # Keep draining until the folder has been quiet for the debounce window
+        while ready and not self._stop.is_set():
+            try:
+                while os.read(self._fd, 64 * 1024):
+                    pass
+            except BlockingIOError:
+                pass
+            ready, _, _ = select.select(fds, [], [], self.debounce)
+        return not self._stop.is_set()
+
+    def _sync(self):
+        try:
+            self.library.refresh(self.root)
+        except ValueError:
+            current = set()
+        else:
+            current = {row[0] for row in self.library.tracks(self.root)}
+            self._watched &= set(self.library.directories(self.root))
+            self._add_watches()
+        added = sorted(current - self._known)
+        removed = sorted(self._known - current)
+        self._known = current
+        if added or removed:
+            self.on_change(added, removed)